@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Crawler refresh cost with the conditional-GET cache, against a local server.
+
+A stand-in server on localhost serves generated genindex-like pages with
+``ETag`` and ``Last-Modified`` validators and answers conditional
+requests with ``304 Not Modified``. The crawler's fetch-and-parse stage
+then runs three times over the same cache:
+
+* cold: empty cache, every page is downloaded and parsed
+* warm: nothing changed, every page is a 304 and no page is parsed
+* changed: a tenth of the pages changed upstream
+
+Every run checks that the parse results are those of the current pages.
+Needs the crawler's requirements (``requests``).
+
+    python benchmarks/bench_crawl_cache.py [--pages 200]
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'crawler'))
+
+from fetcher import Fetcher, fetch_parse  # noqa: E402
+from httpcache import HTTPCache  # noqa: E402
+
+# links per page, about 100 KB like a real genindex page
+LINKS = 1500
+
+
+def make_page(name, version):
+    links = ''.join('<li><a href="generated/{0}.mod{1}.f{2}.html#{0}.mod{1}.f{2}">f{2}</a></li>\n'.format(
+        name, version, i) for i in range(LINKS))
+    return '<html><body><ul>\n{}</ul></body></html>'.format(links).encode('utf-8')
+
+
+def parse_links(content, url):
+    # same shape of work as parse_generated_docs
+    data = {}
+    for href in re.findall('href="([a-zA-Z0-9_./#]+)"', content):
+        if '.' in href and '#' in href and '__' not in href:
+            data[href.split('#')[1]] = url.rsplit('/', 1)[0] + '/' + href
+    return data
+
+
+class Site:
+    """Pages served by the stand-in server.
+
+    The server runs in its own process, so it doesn't compete with the
+    crawler's threads for the GIL. ``POST /<page>`` changes a page.
+    """
+
+    def __init__(self, pages):
+        self.versions = {'page{}'.format(i): 1 for i in range(pages)}
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=self.serve, args=(pages, ready), daemon=True)
+        self.process.start()
+        self.base_url = 'http://127.0.0.1:{}'.format(ready.get())
+
+    def body(self, name):
+        return make_page(name, self.versions[name])
+
+    def update(self, name):
+        self.versions[name] += 1
+        request = urllib.request.Request('{}/{}'.format(self.base_url, name), method='POST')
+        urllib.request.urlopen(request).read()
+
+    def close(self):
+        self.process.terminate()
+
+    @staticmethod
+    def serve(pages, ready):
+        site = {}
+
+        def update(name):
+            version = site.get(name, (None, 0))[1] + 1
+            body = make_page(name, version)
+            site[name] = (body, version, hashlib.sha1(body).hexdigest(), formatdate(usegmt=True))
+
+        for i in range(pages):
+            update('page{}'.format(i))
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                update(self.path.strip('/'))
+                self.send_response(204)
+                self.end_headers()
+
+            def do_GET(self):
+                name = self.path.strip('/')
+                if name not in site:
+                    self.send_error(404)
+                    return
+                body, _, etag, modified = site[name]
+                etag = '"{}"'.format(etag)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        ready.put(server.server_address[1])
+        server.serve_forever()
+
+
+def crawl(site, cache_dir, parsers):
+    urls = ['{}/{}'.format(site.base_url, name) for name in site.versions]
+    start = time.perf_counter()
+    with Fetcher(workers=8, per_host=8, cache=HTTPCache(cache_dir)) as fetcher:
+        jobs = [fetch_parse(fetcher, parsers, url, parse_links) for url in urls]
+        results = [job.result() for job in jobs]
+        stats = list(fetcher.stats.values())[0]
+    elapsed = time.perf_counter() - start
+    for url, result in zip(urls, results):
+        assert result == parse_links(site.body(url.rsplit('/', 1)[1]).decode('utf-8'), url), url
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pages', type=int, default=200)
+    opts = parser.parse_args()
+
+    site = Site(opts.pages)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        print('{:>8} {:>8} {:>8} {:>8} {:>10}'.format('run', 'time s', '200s', '304s', 'KB'))
+        with ProcessPoolExecutor() as parsers:
+            for run in ('cold', 'warm', 'changed'):
+                if run == 'changed':
+                    for name in list(site.versions)[::10]:
+                        site.update(name)
+                elapsed, stats = crawl(site, cache_dir, parsers)
+                print('{:>8} {:>8.2f} {:>8} {:>8} {:>10.0f}'.format(
+                    run, elapsed, stats.requests - stats.not_modified, stats.not_modified,
+                    stats.bytes / 1024.0))
+    finally:
+        site.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""End-to-end script filter latency, in-process vs. the search daemon.
+
+Runs ``python mldocs.py QUERY`` the way Alfred does, with and without
+``MLDOCS_DAEMON=1``, and reports the wall time of each run as seen by
+the caller. The workflow is copied to a temporary directory with a stub
+``info.plist`` and a cache built from the checked-in ``data/ml.jsonl``,
+so nothing is fetched. Update checks are turned off.
+
+    python benchmarks/bench_daemon.py
+"""
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mldaemon  # noqa: E402
+
+QUERIES = (['np.linalg'], ['keras', 'dense'], ['tf'], ['a'], ['torch.nn.conv'], ['gds', 'mnist'], ['zzzq'])
+REPEAT = 10
+
+BUILD = '''
+import os, sys
+sys.path.insert(0, os.getcwd())
+import mldocs
+mldocs.get_ml_docs = mldocs.get_ml_docs_local
+mldocs.load_store(mldocs.make_workflow())
+'''
+
+
+def setup(tmp):
+    wfdir = os.path.join(tmp, 'workflow')
+    shutil.copytree(ROOT, wfdir, ignore=shutil.ignore_patterns(
+        '.git', 'crawler', 'benchmarks', '__pycache__', '*.pickle'))
+    open(os.path.join(wfdir, 'info.plist'), 'w').close()
+    env = dict(os.environ,
+               alfred_workflow_bundleid='com.example.mldocs-bench',
+               alfred_workflow_name='mldocs',
+               alfred_workflow_version='0.0.0',
+               alfred_workflow_cache=os.path.join(tmp, 'cache'),
+               alfred_workflow_data=os.path.join(tmp, 'data'))
+    env.pop('MLDOCS_DAEMON', None)
+    env.pop('alfred_debug', None)
+    os.makedirs(env['alfred_workflow_cache'])
+    os.makedirs(env['alfred_workflow_data'])
+    with open(os.path.join(env['alfred_workflow_data'], 'settings.json'), 'w') as f:
+        json.dump({'__workflow_autoupdate': False}, f)
+    subprocess.check_call([sys.executable, '-c', BUILD], cwd=wfdir, env=env)
+    return wfdir, env
+
+
+def run(wfdir, env, query):
+    start = time.perf_counter()
+    out = subprocess.check_output([sys.executable, 'mldocs.py'] + query, cwd=wfdir, env=env,
+                                  stderr=subprocess.DEVNULL)
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, json.loads(out)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def stop_daemon(env):
+    pidfile = os.path.join(env['alfred_workflow_cache'], mldaemon.JOB_NAME + '.pid')
+    if os.path.exists(pidfile):
+        with open(pidfile, 'rb') as fp:
+            pid = int.from_bytes(fp.read(), sys.byteorder)
+        # that's the workflow.background runner, the daemon is its child
+        # in the same process group
+        try:
+            os.killpg(os.getpgid(pid), signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    sock = mldaemon.socket_path(env['alfred_workflow_cache'])
+    if os.path.exists(sock):
+        os.unlink(sock)
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    wfdir, env = setup(tmp)
+    daemon_env = dict(env, MLDOCS_DAEMON='1')
+    try:
+        # first query starts the daemon, give it a moment to load
+        run(wfdir, daemon_env, ['warmup'])
+        sock = mldaemon.socket_path(env['alfred_workflow_cache'])
+        for _ in range(100):
+            if os.path.exists(sock):
+                break
+            time.sleep(0.05)
+        else:
+            sys.exit('daemon did not start, see the workflow log in ' + env['alfred_workflow_cache'])
+
+        print('{:>16} {:>12} {:>12}'.format('query', 'process ms', 'daemon ms'))
+        for query in QUERIES:
+            local, daemon = [], []
+            for _ in range(REPEAT):
+                ms, expected = run(wfdir, env, query)
+                local.append(ms)
+                ms, got = run(wfdir, daemon_env, query)
+                daemon.append(ms)
+                expected.pop('variables', None)
+                for item in expected['items']:
+                    item.pop('variables', None)
+                assert got == expected, query
+            print('{:>16} {:>12.1f} {:>12.1f}'.format(' '.join(query), median(local), median(daemon)))
+    finally:
+        stop_daemon(env)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Cost of ``Workflow3.send_feedback()`` for mldocs-shaped results.
+
+Items look like mldocs results (title, subtitle, arg, valid, icon path
+out of a handful of assets) and carry the session variable when they
+have one. ``dump`` is what ``send_feedback()`` used to do, ``json.dump``
+of the ``Workflow3.obj`` dict tree, ``to_json`` what it does now. Both
+write the same bytes, which is checked for these items and for items
+using every other field.
+
+    python benchmarks/bench_feedback.py
+"""
+import io
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import mldocs  # noqa: E402
+from workflow import Workflow3  # noqa: E402
+
+SIZES = (15, 200)
+REPEAT = 200
+
+
+def make_workflow(size, session):
+    wf = Workflow3()
+    if session:
+        wf.setvar('_WF_SESSION_ID', '0123456789abcdef0123456789abcdef')
+    icons = sorted(mldocs.get_assets().values())
+    for i in range(size):
+        key = 'tf.keras.layers.Conv{}D_{}'.format(i % 3 + 1, i)
+        url = 'https://www.tensorflow.org/api_docs/python/tf/keras/layers/' + key
+        wf.add_item(title=key, subtitle='2D convolution layer (e.g. spatial convolution over images).',
+                    arg=url, valid=True, icon=icons[i % len(icons)])
+    return wf
+
+
+def every_field():
+    wf = Workflow3()
+    wf.setvar('answer', 42)
+    wf.rerun = 0.5
+    item = wf.add_item('tëst "quoted" \\ ☃', 'sub\ntitle', arg=['a', 'b'], autocomplete='auto',
+                       valid=1, uid='uid', icon='icon.png', icontype='fileicon', type='file',
+                       largetext='large', copytext='copy', quicklookurl='https://example.com',
+                       match='match')
+    item.config['key'] = 'value'
+    item.add_modifier('cmd', subtitle='cmd', arg='cmd-arg', valid=False, icon='cmd.png')
+    wf.add_item(12, None, valid=None)
+    wf.add_item('no icon', icontype='filetype')
+    return wf
+
+
+def dump(wf):
+    out = io.StringIO()
+    json.dump(wf.obj, out)
+    return out.getvalue()
+
+
+def to_json(wf):
+    out = io.StringIO()
+    out.write(wf.to_json())
+    return out.getvalue()
+
+
+def timeit(func, wf):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(wf)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1e6
+
+
+def main():
+    assert dump(every_field()) == to_json(every_field())
+
+    print('{:>6} {:>8} {:>10} {:>12} {:>8}'.format('items', 'session', 'dump us', 'to_json us', 'speedup'))
+    for size in SIZES:
+        for session in (False, True):
+            wf = make_workflow(size, session)
+            assert dump(wf) == to_json(wf)
+            before = timeit(dump, wf)
+            after = timeit(to_json, wf)
+            print('{:>6} {:>8} {:>10.1f} {:>12.1f} {:>7.1f}x'.format(
+                size, 'yes' if session else 'no', before, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
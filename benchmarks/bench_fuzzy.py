@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Latency and recall of queries that need the fuzzy fallback.
+
+Queries are derived from random keywords of the checked-in dataset:
+
+* typo: one edit (insertion, deletion, substitution or transposition)
+  in the last part of the keyword
+* skip: a middle part of the dotted path left out
+* initials: the initials of a camel-case name
+* miss: random words that match nothing and fall through to Google
+
+Only queries without an exact match are kept, so every one goes through
+``mldocs.search()``'s exact lookup *and* the fuzzy matcher. Recall is
+the share of queries whose keyword is among the 15 results. Exits with
+status 1 if the p99 latency of any kind is over the budget.
+
+    python benchmarks/bench_fuzzy.py [--budget-ms 20] [--queries 500]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mlformat  # noqa: E402
+from mldocs import search, search_priority_len  # noqa: E402
+from mlfuzzy import _CAMEL  # noqa: E402
+from mlstore import build_store  # noqa: E402
+
+LIMIT = 15
+
+
+def typo(rnd, key):
+    head, _, last = key.lower().rpartition('.')
+    if len(last) < 5:
+        return None
+    i = rnd.randrange(len(last) - 1)
+    letter = rnd.choice(string.ascii_lowercase)
+    last = rnd.choice((
+        last[:i] + last[i + 1:],
+        last[:i] + letter + last[i:],
+        last[:i] + letter + last[i + 1:],
+        last[:i] + last[i + 1] + last[i] + last[i + 2:],
+    ))
+    return [head + '.' + last if head else last]
+
+
+def skip(rnd, key):
+    parts = key.lower().split('.')
+    if len(parts) < 3:
+        return None
+    del parts[rnd.randrange(1, len(parts) - 1)]
+    return ['.'.join(parts)]
+
+
+def initials(rnd, key):
+    parts = _CAMEL.findall(key.rpartition('.')[2])
+    if len(parts) < 2:
+        return None
+    return [''.join(p[0] for p in parts).lower()]
+
+
+def miss(rnd, key):
+    return [''.join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(3, 12)))
+            for _ in range(rnd.randint(1, 3))]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--budget-ms', type=float, default=20.0)
+    parser.add_argument('--queries', type=int, default=500, help='per kind')
+    opts = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'data', 'ml.jsonl'), encoding='utf-8') as f:
+        header, records = mlformat.load(f)
+        store = build_store(header['bases'], records, priority=search_priority_len)
+    keys = store.keys.tolist()
+    # decode the keywords for short tokens once, as a long-lived process would
+    search(['a'], store)
+
+    rnd = random.Random(0)
+    failed = False
+    print('{:>9} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8}'.format(
+        'kind', 'queries', 'recall', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'))
+    for kind in (typo, skip, initials, miss):
+        times, hits, count = [], 0, 0
+        while count < opts.queries:
+            key = rnd.choice(keys)
+            query = kind(rnd, key)
+            if not query or store.index.search(query):
+                continue
+            count += 1
+            start = time.perf_counter()
+            result = search(list(query), store, limit=LIMIT)
+            times.append((time.perf_counter() - start) * 1000)
+            hits += key in [keys[i] for i in result]
+        p99 = percentile(times, 99)
+        failed |= p99 > opts.budget_ms
+        print('{:>9} {:>7} {:>8} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f}'.format(
+            kind.__name__, count, '-' if kind is miss else '{:.0%}'.format(hits / float(count)),
+            percentile(times, 50), percentile(times, 95), p99, max(times)))
+
+    print('p99 budget {:.0f} ms: {}'.format(opts.budget_ms, 'FAIL' if failed else 'ok'))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Hugging Face docs parsing: single-pass scanner vs. BeautifulSoup.
+
+Runs the crawler's Hugging Face parsers and the BeautifulSoup versions
+they replaced over the same pages, checks that both give the same output
+and compares their times. The pages are either
+
+* generated, with the markup of the Hugging Face docs (sidebar, class
+  docstrings, methods, parameter lists), the default
+* saved: the Hugging Face pages of the crawler's HTTP cache, see
+  ``--cache-dir``
+
+Exits with status 1 if any output differs. Needs ``beautifulsoup4`` for
+the reference parsers.
+
+    python benchmarks/bench_hf_parser.py [--pages 40] [--cache-dir crawler/.http-cache]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'crawler'))
+
+import generate_ml_keywords as crawler  # noqa: E402
+
+MODEL_DOC = 'https://huggingface.co/docs/transformers/model_doc/'
+MAIN_CLASSES = 'https://huggingface.co/docs/transformers/main_classes/'
+INDEX = 'https://huggingface.co/docs/transformers/index'
+
+
+# The BeautifulSoup parsers, as they were before the scanner (minus the
+# progress output).
+
+def reference_main_class_pages(content, url=None):
+    soup = BeautifulSoup(content, 'html.parser')
+    main_class_pages = []
+    for link in soup.select('a'):
+        href = link.get('href', '')
+        if '/main_classes/' in href:
+            page_name = href.split('/')[-1]
+            if page_name and page_name not in main_class_pages:
+                main_class_pages.append(page_name)
+    return sorted(set(main_class_pages))
+
+
+def reference_main_class(content, page_url):
+    data = {}
+    soup = BeautifulSoup(content, 'html.parser')
+    class_sections = soup.find_all(['h2', 'h3'])
+    current_class = None
+    for section in class_sections:
+        class_match = re.search(r'class transformers\.(\w+)', section.text)
+        if class_match:
+            current_class = class_match.group(1)
+            data[f'transformers.{current_class}'] = {'url': f'{page_url}#transformers.{current_class}'}
+            continue
+        section_id = section.get('id', '')
+        if not section_id or section_id.startswith('_') or section_id.endswith('_'):
+            continue
+        if current_class:
+            data[f'transformers.{current_class}.{section_id}'] = {
+                'url': f'{page_url}#transformers.{current_class}.{section_id}'}
+    return data
+
+
+def reference_model_links(content, base_url, test_mode=False):
+    soup = BeautifulSoup(content, 'html.parser')
+    model_links = []
+    for link in soup.find_all('a'):
+        href = link.get('href')
+        if href and 'model_doc' in href:
+            if href.startswith('http'):
+                full_url = href
+            elif href.startswith('//'):
+                full_url = f'https:{href}'
+            elif href.startswith('/'):
+                full_url = f'{crawler.HF_DOMAIN}{href}'
+            else:
+                docs_base = '/'.join(base_url.split('/')[:-1])
+                full_url = f'{docs_base}/{href}'
+            model_links.append(full_url)
+    return model_links
+
+
+def reference_model_doc(content, model_url):
+    data = {}
+    model_soup = BeautifulSoup(content, 'html.parser')
+    model_name = model_url.split('/')[-1].replace('-', '_')
+    data[f'transformers.{model_name}'] = {'url': model_url}
+    class_sections = model_soup.find_all(['h2', 'h3'])
+    current_class = None
+    for section in class_sections:
+        class_match = re.search(r'class transformers\.([\w]+)', section.text)
+        if class_match:
+            current_class = class_match.group(1)
+            data[f'transformers.{model_name}.{current_class}'] = {
+                'url': f'{model_url}#transformers.{current_class.split(".")[-1]}'}
+            continue
+        section_id = section.get('id', '')
+        if not section_id or section_id.startswith('_') or section_id.endswith('_'):
+            continue
+        if current_class:
+            current_class = section_id
+            class_key = f'transformers.{model_name}.{current_class}'
+            desc = ''
+            next_p = section.find_next('p')
+            if next_p:
+                desc = next_p.text
+            data[class_key] = {'url': f'{model_url}#{section_id}', 'desc': desc}
+            method_sections = section.find_next(['h4', 'h5'])
+            while method_sections and method_sections.find_previous(['h2', 'h3']) == section:
+                method_id = method_sections.get('id', '')
+                if method_id and not method_id.startswith('_'):
+                    desc = ''
+                    params = []
+                    next_elem = method_sections.find_next(['p', 'ul'])
+                    while next_elem and next_elem.name in ['p', 'ul']:
+                        if next_elem.name == 'p':
+                            desc += next_elem.text + ' '
+                        elif next_elem.name == 'ul':
+                            for li in next_elem.find_all('li'):
+                                params.append(li.text)
+                        next_elem = next_elem.find_next(['p', 'ul'])
+                    data[f'{class_key}.{method_id}'] = {
+                        'url': f'{model_url}#{method_id}', 'desc': desc.strip(), 'params': params}
+                method_sections = method_sections.find_next(['h4', 'h5'])
+    return data
+
+
+PARSERS = {
+    'links': (crawler.parse_huggingface_model_links, reference_model_links),
+    'pages': (crawler.parse_huggingface_main_class_pages, reference_main_class_pages),
+    'main_class': (crawler.parse_huggingface_main_class, reference_main_class),
+    'model_doc': (crawler.parse_huggingface_model_doc, reference_model_doc),
+}
+
+
+def words(rnd, n):
+    return ' '.join(rnd.choice(('the', 'model', 'tensor', 'of', 'shape', 'hidden', 'states', 'is',
+                                'a', '<code>int</code>', '&amp;', 'config', 'returns'))
+                    for _ in range(n))
+
+
+def sidebar(rnd, models, main_classes):
+    links = ['<a class="transform py-1 pl-2" href="/docs/transformers/model_doc/{}">{}</a>'.format(m, m.upper())
+             for m in models]
+    links += ['<a class="transform py-1 pl-2" href="/docs/transformers/main_classes/{}">{}</a>'.format(p, p)
+              for p in main_classes]
+    return '<nav><ul>{}</ul></nav>'.format(''.join('<li>{}</li>'.format(link) for link in links))
+
+
+def docstring(rnd, heading, name, methods):
+    params = ''.join('<li class="text-base !pl-4 my-3"><span><strong>p{}</strong> (<code>int</code>) &mdash; {}'
+                     '</span></li>'.format(i, words(rnd, 20)) for i in range(rnd.randint(4, 20)))
+    html = ('<div class="docstring border-l-2 pl-4"><div><span class="group flex full-w">'
+            '<{0} class="!m-0"><span class="flex-1 break-all"><span class="font-light">class</span> '
+            '<span class="font-medium">transformers.</span><span class="font-semibold">{1}</span></span></{0}>'
+            '<a id="transformers.{1}" class="header-link" href="#transformers.{1}"></a></span>'
+            '<p class="flex flex-wrap">( {2} )</p></div>'
+            '<div class="!mb-10 relative docstring-details"><p class="font-semibold">Parameters</p>'
+            '<ul class="px-2">{3}</ul></div><p>{4}</p><p>{4}</p>').format(
+                heading, name, words(rnd, 30), params, words(rnd, 60))
+    for method in methods:
+        html += ('<div class="docstring"><span class="group flex"><h4 class="!m-0"><span>{1}</span></h4>'
+                 '<a id="transformers.{0}.{1}" href="#transformers.{0}.{1}"></a></span>'
+                 '<p>( {2} )</p><ul><li>{3}</li><li>{3}</li></ul><p>{4}</p></div>').format(
+                     name, method, words(rnd, 15), words(rnd, 10), words(rnd, 40))
+    return html + '</div>'
+
+
+def section(rnd, title, section_id=None):
+    anchor = section_id or re.sub(r'\W+', '-', title.lower())
+    heading = '<h2 class="relative group"{}><a id="{}" class="header-link" href="#{}"></a><span>{}</span></h2>'
+    return heading.format(' id="{}"'.format(section_id) if section_id else '', anchor, anchor, title) + \
+        ''.join('<p>{}</p>'.format(words(rnd, 50)) for _ in range(rnd.randint(1, 4)))
+
+
+def model_page(rnd, name, models, main_classes):
+    camel = name.title().replace('_', '')
+    body = [section(rnd, 'Overview'), section(rnd, 'Usage tips')]
+    for suffix in ('Config', 'ImageProcessor', 'Tokenizer', 'Model', 'ForCausalLM', 'ForSequenceClassification',
+                   'ForTokenClassification', 'ForQuestionAnswering', 'TFModel', 'FlaxModel')[:rnd.randint(3, 10)]:
+        cls = camel + suffix
+        body.append(section(rnd, cls))
+        methods = ['forward', 'call', 'from_pretrained', 'save_pretrained', 'get_input_embeddings']
+        body.append(docstring(rnd, 'h3', cls, methods[:rnd.randint(0, 5)]))
+        if rnd.random() < 0.3:
+            # sections with an id of their own, after a class
+            body.append(section(rnd, 'Resources', 'resources'))
+    return '<html><head><script>var x = "<h2>class transformers.Nope</h2>";</script></head><body>{}' \
+           '<div class="prose-doc"><h1>{}</h1>{}</div></body></html>'.format(
+               sidebar(rnd, models, main_classes), name, ''.join(body))
+
+
+def main_class_page(rnd, name, models, main_classes):
+    body = [section(rnd, name.title())]
+    for i in range(rnd.randint(2, 12)):
+        cls = '{}{}'.format(name.title().replace('_', ''), i)
+        body.append(docstring(rnd, rnd.choice(('h2', 'h3')), cls, ['__call__', 'save', 'load'][:rnd.randint(0, 3)]))
+    return '<html><body>{}<div class="prose-doc">{}</div></body></html>'.format(
+        sidebar(rnd, models, main_classes), ''.join(body))
+
+
+def generated_pages(count):
+    rnd = random.Random(0)
+    models = ['model{}'.format(i) for i in range(400)]
+    main_classes = ['trainer', 'pipelines', 'configuration', 'model', 'tokenizer', 'optimizer_schedules',
+                    'feature_extractor', 'image_processor', 'callback', 'data_collator']
+    pages = [('links', INDEX, model_page(rnd, 'index', models, main_classes)),
+             ('pages', MAIN_CLASSES + 'configuration', main_class_page(rnd, 'configuration', models, main_classes))]
+    for name in main_classes:
+        pages.append(('main_class', MAIN_CLASSES + name, main_class_page(rnd, name, models, main_classes)))
+    for name in models[:count]:
+        pages.append(('model_doc', MODEL_DOC + name, model_page(rnd, name, models, main_classes)))
+    return pages
+
+
+def cached_pages(cache_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(cache_dir, '*.json'))):
+        with open(path) as f:
+            entry = json.load(f)
+        if 'url' not in entry:
+            continue
+        url = entry['url']
+        if url.startswith(MODEL_DOC):
+            kind = 'model_doc'
+        elif url.startswith(MAIN_CLASSES):
+            kind = 'main_class'
+        elif url.startswith('https://huggingface.co/docs/transformers'):
+            kind = 'links'
+        else:
+            continue
+        with open(path[:-len('json')] + 'body', 'rb') as f:
+            content = f.read().decode(entry.get('encoding') or 'utf-8', errors='replace')
+        pages.append((kind, url, content))
+        if kind == 'main_class':
+            pages.append(('pages', url, content))
+    return pages
+
+
+def timed(func, content, url):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(content, url)
+        return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pages', type=int, default=40, help='generated model pages')
+    parser.add_argument('--cache-dir', help='use the Hugging Face pages of this crawler cache')
+    opts = parser.parse_args()
+
+    pages = cached_pages(opts.cache_dir) if opts.cache_dir else generated_pages(opts.pages)
+    print('{} pages, {:.1f} MB'.format(len(pages), sum(len(p[2]) for p in pages) / 1e6))
+    print('{:>11} {:>6} {:>10} {:>10} {:>8} {:>10}'.format('parser', 'pages', 'bs4 ms', 'scan ms', 'speedup', 'identical'))
+    failed = False
+    for kind, (parse, reference) in PARSERS.items():
+        old = new = 0.0
+        same = count = 0
+        for page_kind, url, content in pages:
+            if page_kind != kind:
+                continue
+            expected, seconds = timed(reference, content, url)
+            old += seconds
+            result, seconds = timed(parse, content, url)
+            new += seconds
+            count += 1
+            same += result == expected
+            if result != expected:
+                print('  differs: {}'.format(url))
+        if not count:
+            continue
+        failed |= same != count
+        print('{:>11} {:>6} {:>10.1f} {:>10.1f} {:>7.1f}x {:>10}'.format(
+            kind, count, old * 1000, new * 1000, old / new, '{}/{}'.format(same, count)))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Startup cost of ``import mldocs`` on the warm (cached data) path.
+
+Runs ``python -X importtime`` in a fresh interpreter and exits non-zero if
+the network stack is imported or the cumulative import time of ``mldocs``
+exceeds the budget.
+
+    python benchmarks/bench_imports.py [--budget-ms 250]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# only needed when the dataset has to be downloaded
+FORBIDDEN = ('requests', 'urllib3', 'chardet', 'idna', 'certifi')
+
+PROBE = '''
+import sys
+before = set(sys.modules)
+import mldocs
+print('\\n'.join(sorted(set(sys.modules) - before)))
+'''
+
+
+def import_profile():
+    """Return (modules imported by mldocs, {module: cumulative us})."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return proc.stdout.split(), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=250.0)
+    parser.add_argument('--runs', type=int, default=5)
+    opts = parser.parse_args()
+
+    failed = False
+    totals = []
+    for _ in range(opts.runs):
+        modules, timings = import_profile()
+        totals.append(timings['mldocs'] / 1000.0)
+
+    heavy = sorted(m for m in modules if set(m.split('.')).intersection(FORBIDDEN))
+    if heavy:
+        print('FAIL: warm path imports {} network stack modules, e.g. {}'.format(
+            len(heavy), ', '.join(heavy[:5])))
+        failed = True
+
+    totals.sort()
+    median = totals[len(totals) // 2]
+    print('import mldocs: median {:.1f} ms over {} runs ({} modules)'.format(
+        median, opts.runs, len(modules)))
+    if median > opts.budget_ms:
+        print('FAIL: over budget of {:.1f} ms'.format(opts.budget_ms))
+        failed = True
+
+    slowest = sorted(timings.items(), key=lambda kv: -kv[1])[1:11]
+    for name, us in slowest:
+        print('  {:>8.1f} ms  {}'.format(us / 1000.0, name))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
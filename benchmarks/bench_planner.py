@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Multi-token queries: rarest-first planning vs. the query's own order.
+
+Three ways of finding the keywords that contain every token, all on the
+index built from the checked-in ``data/ml.jsonl``:
+
+* scan: the list comprehension chain ``search()`` started with, one pass
+  over the keywords per token, in the order they were typed
+* sequential: the index, tokens in the order they were typed (short ones
+  last) and posting lists intersected as sets
+* planned: ``KeywordIndex.search()``, rarest token first and posting
+  lists of very different lengths intersected by galloping
+
+Every query is checked to give the same ids all three ways.
+
+    python benchmarks/bench_planner.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mlformat  # noqa: E402
+from mlindex import GRAM_SIZE, trigrams  # noqa: E402
+from mlstore import build_store  # noqa: E402
+
+QUERIES = (
+    ['nn', 'conv', '2d'],
+    ['tf', 'keras', 'dense'],
+    ['layers', 'conv2d'],
+    ['matplotlib', 'axes', 'set_xlabel'],
+    ['pandas', 'dataframe', 'to_csv'],
+    ['transformers', 'bert', 'tokenizer'],
+    ['keras', 'ops', 'image'],
+    ['np', 'linalg', 'svd'],
+    ['ray', 'data', 'read'],
+    ['a', 'e', 'plot'],
+)
+REPEAT = 50
+
+
+def scan(tokens, keys):
+    ids = range(len(keys))
+    for token in tokens:
+        ids = [i for i in ids if token in keys[i]]
+    return ids
+
+
+def lookup_sequential(index, token, ids=None):
+    # KeywordIndex.lookup() before the planner
+    if len(token) < GRAM_SIZE:
+        lowered = index._all_lowered
+        if ids is None:
+            return [i for i, key in enumerate(lowered) if token in key]
+        return [i for i in ids if token in lowered[i]]
+
+    lists = []
+    for gram in trigrams(token):
+        posting = index.posting(gram)
+        if not posting:
+            return []
+        lists.append(posting)
+    lists.sort(key=len)
+
+    if ids is not None and len(ids) <= len(lists[0]):
+        lowered = index.lowered
+        return [i for i in ids if token in lowered[i]]
+
+    candidates = set(lists[0])
+    for posting in lists[1:]:
+        candidates.intersection_update(posting)
+        if not candidates:
+            return []
+    if ids is not None:
+        candidates.intersection_update(ids)
+    lowered = index.lowered
+    return [i for i in sorted(candidates) if token in lowered[i]]
+
+
+def search_sequential(index, tokens):
+    ids = None
+    for token in sorted(tokens, key=lambda t: len(t) < GRAM_SIZE):
+        ids = lookup_sequential(index, token, ids)
+        if not ids:
+            return []
+    return list(ids)
+
+
+def timeit(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    with open(os.path.join(ROOT, 'data', 'ml.jsonl'), encoding='utf-8') as f:
+        header, records = mlformat.load(f)
+        store = build_store(header['bases'], records)
+    index = store.index
+    keys = index.lowered.tolist()
+    # both index paths check short tokens against the decoded keywords
+    index._all_lowered = keys
+
+    print('{:>32} {:>8} {:>10} {:>14} {:>11}'.format(
+        'query', 'matches', 'scan ms', 'sequential ms', 'planned ms'))
+    for query in QUERIES:
+        expected = scan(query, keys)
+        assert search_sequential(index, query) == expected, query
+        assert index.search(query) == expected, query
+        print('{:>32} {:>8} {:>10.3f} {:>14.3f} {:>11.3f}'.format(
+            ' '.join(query), len(expected),
+            timeit(lambda: scan(query, keys)),
+            timeit(lambda: search_sequential(index, query)),
+            timeit(lambda: index.search(query))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Latency of the script filter's query path, phase by phase.
+
+The workflow is copied to a temporary directory with a stub ``info.plist``
+and a cache built from the checked-in dataset (``data/ml.jsonl``, the
+compact form of ``data/ml.json``), so nothing is fetched. Update checks
+are turned off. Every query of the corpus is then measured as:
+
+* cold: ``python mldocs.py QUERY`` in a fresh interpreter, what Alfred
+  runs on every keystroke, as seen by the caller
+* warm: creating the ``Workflow3`` and opening the cached store in an
+  interpreter that already imported everything
+* search: ``mldocs.search()``
+* render: the rest of ``mldocs.add_results()``, building the items
+* feedback: ``Workflow3.send_feedback()``, serializing them
+
+Percentiles are printed in milliseconds and, with ``--output``, saved as
+JSON along with the commit they were measured on. ``--compare`` prints
+the median of every phase against an earlier run.
+
+    python benchmarks/bench_query.py [--output results.json] [--compare base.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import plistlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = {
+    'single': (['conv2d'], ['tensorflow'], ['a']),
+    'dotted': (['torch.nn.conv2d'], ['tf.keras.layers.dense'], ['sklearn.metrics']),
+    'multi': (['keras', 'dense'], ['nn', 'conv', '2d']),
+    'expansion': (['np.linalg'], ['pd.read_csv'], ['plt.plot'], ['sns.heatmap']),
+    'no hit': (['zzzq'], ['qqxj', 'wvvz']),
+    'command': (['gds', 'mnist'], ['paper', 'attention']),
+}
+PHASES = ('cold', 'warm', 'search', 'render', 'feedback')
+PERCENTILES = (50, 90, 99)
+
+BUILD = '''
+import os, sys
+sys.path.insert(0, os.getcwd())
+import mldocs
+mldocs.get_ml_docs = mldocs.get_ml_docs_local
+mldocs.load_store(mldocs.make_workflow())
+'''
+
+
+def setup(tmp):
+    wfdir = os.path.join(tmp, 'workflow')
+    shutil.copytree(ROOT, wfdir, ignore=shutil.ignore_patterns(
+        '.git', 'crawler', 'benchmarks', '__pycache__', '*.pickle'))
+    with open(os.path.join(wfdir, 'info.plist'), 'wb') as f:
+        plistlib.dump({'bundleid': 'com.example.mldocs-bench', 'name': 'mldocs'}, f)
+    env = dict(os.environ,
+               alfred_workflow_bundleid='com.example.mldocs-bench',
+               alfred_workflow_name='mldocs',
+               alfred_workflow_version='0.0.0',
+               alfred_workflow_cache=os.path.join(tmp, 'cache'),
+               alfred_workflow_data=os.path.join(tmp, 'data'))
+    for name in ('MLDOCS_DAEMON', 'alfred_debug', '_WF_SESSION_ID'):
+        env.pop(name, None)
+    os.makedirs(env['alfred_workflow_cache'])
+    os.makedirs(env['alfred_workflow_data'])
+    with open(os.path.join(env['alfred_workflow_data'], 'settings.json'), 'w') as f:
+        json.dump({'__workflow_autoupdate': False}, f)
+    subprocess.check_call([sys.executable, '-c', BUILD], cwd=wfdir, env=env)
+    return wfdir, env
+
+
+def percentiles(times):
+    times = sorted(times)
+    result = {'p{}'.format(p): times[min(len(times) - 1, len(times) * p // 100)] * 1000
+              for p in PERCENTILES}
+    result['mean'] = sum(times) / len(times) * 1000
+    result['runs'] = len(times)
+    return result
+
+
+def run_cold(wfdir, env, query, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.check_output([sys.executable, 'mldocs.py'] + query, cwd=wfdir, env=env,
+                                      stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+        assert json.loads(out)['items'], query
+    return times
+
+
+def run_warm(mldocs, query, repeat):
+    """Return the times of the in-process phases of ``query``."""
+    times = {phase: [] for phase in PHASES[1:]}
+    searched = []
+    search = mldocs.search
+
+    def timed_search(*args, **kwargs):
+        start = time.perf_counter()
+        result = search(*args, **kwargs)
+        searched.append(time.perf_counter() - start)
+        return result
+
+    mldocs.search = timed_search
+    stdout = sys.stdout
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            wf = mldocs.make_workflow()
+            store = mldocs.load_store(wf)
+            times['warm'].append(time.perf_counter() - start)
+
+            del searched[:]
+            start = time.perf_counter()
+            # the session cache would turn repeated runs into cache hits
+            mldocs.add_results(wf, list(query), store, session=False)
+            elapsed = time.perf_counter() - start
+            times['search'].append(sum(searched))
+            times['render'].append(elapsed - sum(searched))
+
+            sys.stdout = io.StringIO()
+            start = time.perf_counter()
+            wf.send_feedback()
+            times['feedback'].append(time.perf_counter() - start)
+            sys.stdout = stdout
+    finally:
+        sys.stdout = stdout
+        mldocs.search = search
+    return times
+
+
+def commit():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, base=None):
+    print('{:>24} {:>9} {:>9} {:>9} {:>9}{}'.format(
+        'query', 'phase', 'p50 ms', 'p90 ms', 'p99 ms', '  vs base' if base else ''))
+    for name, phases in results.items():
+        label = name
+        for phase in PHASES:
+            stats = phases[phase]
+            line = '{:>24} {:>9} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+                label, phase, stats['p50'], stats['p90'], stats['p99'])
+            old = base and base.get(name, {}).get(phase)
+            if old and old['p50']:
+                line += ' {:>8.2f}x'.format(stats['p50'] / old['p50'])
+            print(line)
+            label = ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50, help='in-process runs per query')
+    parser.add_argument('--cold-repeat', type=int, default=5, help='fresh processes per query')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run')
+    opts = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        wfdir, env = setup(tmp)
+        os.environ.update(env)
+        for name in ('MLDOCS_DAEMON', 'alfred_debug', '_WF_SESSION_ID'):
+            os.environ.pop(name, None)
+        # mldocs reads its assets relative to the workflow directory
+        os.chdir(wfdir)
+        sys.path.insert(0, wfdir)
+        import mldocs
+
+        results = {}
+        for kind, queries in QUERIES.items():
+            for query in queries:
+                name = '{}: {}'.format(kind, ' '.join(query))
+                times = run_warm(mldocs, query, opts.repeat)
+                times['cold'] = run_cold(wfdir, env, query, opts.cold_repeat)
+                results[name] = {phase: percentiles(times[phase]) for phase in PHASES}
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    base = None
+    if opts.compare:
+        with open(opts.compare) as f:
+            base = json.load(f)['results']
+    report(results, base)
+
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            json.dump({'commit': commit(),
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                       'repeat': opts.repeat,
+                       'cold_repeat': opts.cold_repeat,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Peak memory and time of a dataset refresh, buffered vs. streamed.
+
+A local file server serves the checked-in ``data/ml.jsonl``. Each mode
+downloads it, builds the store and writes it to a cache file, then runs
+a first query against the result, in a fresh process:
+
+* buffered: what a refresh used to do. The whole body is read, decoded
+  and split into lines, the records are listed, and the store is
+  assembled in memory before being written.
+* streaming: ``mldocs.get_data()``, which parses records as the body
+  comes in and writes the store section by section to the cache file.
+
+Reported: peak Python heap (tracemalloc), peak RSS, and the time until
+the first query could be answered.
+
+    python benchmarks/bench_refresh.py
+"""
+import functools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import os, resource, sys, time, tracemalloc
+sys.path.insert(0, {root!r})
+tracemalloc.start()
+import mldocs, mlformat
+from libs import requests
+from mlstore import KeywordStoreSerializer, build_store
+from workflow.util import atomic_writer
+
+wf = mldocs.make_workflow()
+path = wf.cachefile('data.mlstore')
+tracemalloc.reset_peak()
+start = time.perf_counter()
+if {mode!r} == 'buffered':
+    body = requests.get(os.environ['MLDOCS_DATA_URL'] + '/ml.jsonl').content
+    header, records = mlformat.load(body.decode('utf-8').splitlines())
+    records = list(records)
+    icons, base_icons = mldocs.get_icons(header['bases'], mldocs.get_assets())
+    store = build_store(header['bases'], records, icons, base_icons,
+                        priority=mldocs.search_priority_len, meta={{'assets': {{}}}})
+    buf = bytes(store.buffer)
+    with atomic_writer(path, 'wb') as fp:
+        fp.write(buf)
+else:
+    with atomic_writer(path, 'w+b') as fp:
+        store = mldocs.get_data(wf, fp)
+with open(path, 'rb') as fp:
+    store = KeywordStoreSerializer.load(fp)
+result = mldocs.search(['conv2d'], store, limit=15)
+elapsed = time.perf_counter() - start
+peak = tracemalloc.get_traced_memory()[1]
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, peak, rss, len(result))
+'''
+
+
+class Handler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    # ml.jsonl without the shards next to it, so get_data() downloads it
+    published = tempfile.mkdtemp()
+    shutil.copy(os.path.join(ROOT, 'data', 'ml.jsonl'), published)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=published))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache = tempfile.mkdtemp()
+    env = dict(os.environ,
+               MLDOCS_DATA_URL='http://127.0.0.1:{}'.format(server.server_address[1]),
+               alfred_workflow_bundleid='com.bench.mldocs', alfred_workflow_name='mldocs',
+               alfred_workflow_cache=cache, alfred_workflow_data=cache, alfred_version='4.0')
+    try:
+        print('{:>10} {:>10} {:>10} {:>16}'.format('mode', 'heap MB', 'RSS MB', 'first result s'))
+        for mode in ('buffered', 'streaming'):
+            out = subprocess.check_output([sys.executable, '-c', CHILD.format(root=ROOT, mode=mode)],
+                                          cwd=ROOT, env=env)
+            elapsed, peak, rss, results = out.split()[-4:]
+            assert int(results) > 0
+            # ru_maxrss is in kilobytes on Linux, bytes on macOS
+            rss = int(rss) / (1e6 if sys.platform == 'darwin' else 1e3)
+            print('{:>10} {:>10.1f} {:>10.1f} {:>16.2f}'.format(
+                mode, int(peak) / 1e6, rss, float(elapsed)))
+    finally:
+        server.shutdown()
+        shutil.rmtree(published, ignore_errors=True)
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
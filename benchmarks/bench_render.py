@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Per-result rendering cost: icon lookup plus building the Alfred item.
+
+``scan`` is the old per-result loop that parses the domain of the URL and
+tests every asset name against it, ``lookup`` reads the icon id stored
+with the record. Both render the same records with the same icons.
+
+    python benchmarks/bench_render.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import mlformat  # noqa: E402
+from mldocs import get_assets, get_icons, parse_domain  # noqa: E402
+from mlstore import build_store  # noqa: E402
+
+REPEAT = 200
+RESULTS = 15
+
+
+def render_scan(store, ids, assets, asset_keywords):
+    items = []
+    for i in ids:
+        link = store.url(i)
+        icon = None
+        for k in asset_keywords:
+            if k in parse_domain(link):
+                icon = assets[k]
+        items.append({'title': store.keys[i], 'subtitle': store.descs[i],
+                      'arg': link, 'icon': icon})
+    return items
+
+
+def render_lookup(store, ids):
+    items = []
+    for i in ids:
+        items.append({'title': store.keys[i], 'subtitle': store.descs[i],
+                      'arg': store.url(i), 'icon': store.icon(i)})
+    return items
+
+
+def timeit(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    assets = get_assets()
+    asset_keywords = sorted(assets.keys(), key=len)
+    with open(os.path.join(ROOT, 'data', 'ml.jsonl'), encoding='utf-8') as f:
+        header, records = mlformat.load(f)
+        store = build_store(header['bases'], records, *get_icons(header['bases'], assets))
+
+    # spread the pages over the whole dataset so many domains are hit
+    step = len(store) // (RESULTS * 20)
+    pages = [list(range(start, start + RESULTS * step, step))
+             for start in range(0, step * 20, step)]
+    for ids in pages:
+        assert render_scan(store, ids, assets, asset_keywords) == render_lookup(store, ids)
+
+    print('{:>8} {:>14} {:>14}'.format('mode', 'page us', 'result us'))
+    for mode, func in (('scan', lambda ids: render_scan(store, ids, assets, asset_keywords)),
+                       ('lookup', lambda ids: render_lookup(store, ids))):
+        page = sum(timeit(lambda: func(ids)) for ids in pages) / len(pages) * 1e6
+        print('{:>8} {:>14.1f} {:>14.2f}'.format(mode, page, page / RESULTS))
+
+
+if __name__ == '__main__':
+    main()
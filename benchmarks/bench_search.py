@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Query latency of the keyword index vs. a linear scan as the dataset grows.
+
+The checked-in ``data/ml.json`` is padded with synthetic keywords (random
+dotted paths that real queries don't hit) up to each target size, so the
+number of matches stays the same while the number of keys grows.
+
+    python benchmarks/bench_search.py
+"""
+import json
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mlstore import build_store  # noqa: E402
+
+SIZES = (23000, 50000, 100000, 200000)
+QUERIES = (['np.linalg'], ['keras', 'dense'], ['dataframe.groupby'], ['nn', 'conv2d'], ['xgbclassifier'])
+REPEAT = 50
+
+
+def scan(tokens, keys):
+    for token in tokens:
+        keys = [k for k in keys if token in k.lower()]
+    return keys
+
+
+def synthetic_keys(n, seed=0):
+    rnd = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits + '_'
+    for i in range(n):
+        atoms = [''.join(rnd.choice(alphabet) for _ in range(rnd.randint(3, 9)))
+                 for _ in range(rnd.randint(2, 5))]
+        yield 'synth{}.{}'.format(i, '.'.join(atoms))
+
+
+def timeit(func):
+    best = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        best.append(time.perf_counter() - start)
+    best.sort()
+    return best[len(best) // 2] * 1000
+
+
+def main():
+    with open(os.path.join(ROOT, 'data', 'ml.json')) as f:
+        keys = list(json.load(f))
+
+    print('{:>8} {:>22} {:>10} {:>10}'.format('keys', 'query', 'scan ms', 'index ms'))
+    for size in SIZES:
+        padded = keys + list(synthetic_keys(max(0, size - len(keys))))
+        index = build_store([''], ((k, 0, '', '') for k in padded)).index
+        for query in QUERIES:
+            expected = scan(query, padded)
+            assert [padded[i] for i in index.search(query)] == expected
+            print('{:>8} {:>22} {:>10.3f} {:>10.3f}'.format(
+                len(padded), ' '.join(query),
+                timeit(lambda: scan(query, padded)),
+                timeit(lambda: index.search(query))))
+
+
+if __name__ == '__main__':
+    main()
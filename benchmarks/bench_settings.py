@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Settings I/O per run: writing on every change vs. once at exit.
+
+``eager`` is ``workflow.Settings`` as it was, which took the lock to
+read ``settings.json`` and rewrote the whole file on every assignment,
+``coalesced`` the current one. Each run reads the settings in a fresh
+object, like a fresh script filter process does, and then:
+
+* keystroke: what ``Workflow.run()`` does on every query, reading the
+  update settings and setting the last version run, which didn't change
+* configure: five settings changed, e.g. by magic arguments, then the
+  exit-time save
+
+Reported: lock acquisitions and file writes per run, and the time.
+
+    python benchmarks/bench_settings.py
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from copy import deepcopy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import workflow.workflow  # noqa: E402
+from workflow.util import LockFile, atomic_writer  # noqa: E402
+
+REPEAT = 200
+COUNTS = {'locks': 0, 'writes': 0}
+
+
+class CountingLockFile(LockFile):
+    def acquire(self, blocking=True):
+        COUNTS['locks'] += 1
+        return super(CountingLockFile, self).acquire(blocking)
+
+
+def counting_writer(path, mode):
+    COUNTS['writes'] += 1
+    return atomic_writer(path, mode)
+
+
+class EagerSettings(dict):
+    # workflow.Settings before changes were coalesced
+    def __init__(self, filepath, defaults=None):
+        super(EagerSettings, self).__init__()
+        self._filepath = filepath
+        self._nosave = False
+        self._original = {}
+        if os.path.exists(self._filepath):
+            self._load()
+        elif defaults:
+            for key, val in list(defaults.items()):
+                self[key] = val
+            self.save()
+
+    def _load(self):
+        data = {}
+        with CountingLockFile(self._filepath, 0.5):
+            with open(self._filepath, 'r') as fp:
+                data.update(json.load(fp))
+        self._original = deepcopy(data)
+        self._nosave = True
+        self.update(data)
+        self._nosave = False
+
+    def save(self):
+        if self._nosave:
+            return
+        data = {}
+        data.update(self)
+        with CountingLockFile(self._filepath, 0.5):
+            with counting_writer(self._filepath, 'w') as fp:
+                json.dump(data, fp, sort_keys=True, indent=2)
+
+    def __setitem__(self, key, value):
+        if self._original.get(key) != value:
+            super(EagerSettings, self).__setitem__(key, value)
+            self.save()
+
+    def __delitem__(self, key):
+        super(EagerSettings, self).__delitem__(key)
+        self.save()
+
+    def update(self, *args, **kwargs):
+        super(EagerSettings, self).update(*args, **kwargs)
+        self.save()
+
+
+def keystroke(settings_class, path):
+    settings = settings_class(path)
+    settings.get('__workflow_autoupdate', True)
+    settings.get('__workflow_prereleases', False)
+    settings['__workflow_last_version'] = '2.0.0'
+    return settings
+
+
+def configure(settings_class, path):
+    settings = settings_class(path)
+    settings['__workflow_autoupdate'] = False
+    settings['__workflow_prereleases'] = True
+    settings['__workflow_diacritic_folding'] = True
+    settings['__workflow_perf'] = True
+    settings['__workflow_last_version'] = '2.0.1'
+    return settings
+
+
+def measure(settings_class, scenario, path):
+    initial = {'__workflow_last_version': '2.0.0', 'api_key': 'secret'}
+    COUNTS.update(locks=0, writes=0)
+    elapsed = 0.0
+    for _ in range(REPEAT):
+        with open(path, 'w') as fp:
+            json.dump(initial, fp)
+        start = time.perf_counter()
+        settings = scenario(settings_class, path)
+        # what the exit handler of a coalescing Settings does
+        if isinstance(settings, workflow.workflow.Settings):
+            settings.save()
+        elapsed += time.perf_counter() - start
+    return COUNTS['locks'] / REPEAT, COUNTS['writes'] / REPEAT, elapsed / REPEAT * 1e6
+
+
+def main():
+    # count the lock and writes of workflow.Settings too
+    workflow.workflow.LockFile = CountingLockFile
+    workflow.workflow.atomic_writer = counting_writer
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'settings.json')
+    try:
+        print('{:>10} {:>10} {:>8} {:>8} {:>8}'.format('run', 'settings', 'locks', 'writes', 'us'))
+        for scenario in (keystroke, configure):
+            results = {}
+            for label, settings_class in (('eager', EagerSettings),
+                                          ('coalesced', workflow.workflow.Settings)):
+                locks, writes, us = measure(settings_class, scenario, path)
+                with open(path) as fp:
+                    results[label] = json.load(fp)
+                print('{:>10} {:>10} {:>8.0f} {:>8.0f} {:>8.1f}'.format(
+                    scenario.__name__, label, locks, writes, us))
+            assert results['eager'] == results['coalesced']
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Cost of publishing the dataset from per-source shards.
+
+The checked-in ``data/ml.json`` is split into shards by the first
+component of the keywords (``tf``, ``torch``, ``numpy``, ...), standing
+in for the crawler's seed sources. The crawler's publishing step (update
+the shards, merge them if any changed, write ``ml.json`` and
+``ml.jsonl``) then runs three times:
+
+* cold: no shards yet, everything is written
+* unchanged: the crawl found nothing new
+* changed: one source got a new keyword
+
+and the merged dataset is checked against a plain ``dict.update()`` of
+the sources in order.
+
+    python benchmarks/bench_shards.py
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'crawler'))
+
+from shards import ShardSet, decode, encode, sha1  # noqa: E402
+
+
+def publish(directory, sources):
+    # same steps as the end of crawler/generate_ml_keywords.py
+    shards = ShardSet(directory)
+    for name, data in sources.items():
+        shards.update(name, data)
+    order = list(sources)
+    shards.save(order)
+    compact_file = os.path.join(directory, 'ml.jsonl')
+    if not shards.stale(compact_file):
+        return shards, False
+    data = shards.merge(order)
+    with open(os.path.join(directory, 'ml.json'), 'w') as f:
+        json.dump(data, f, indent=2)
+    body = encode(data)
+    with open(compact_file, 'wb') as f:
+        f.write(body)
+    shards.dataset = {'sha1': sha1(body), 'count': len(data)}
+    shards.save(order)
+    return shards, True
+
+
+def main():
+    with open(os.path.join(ROOT, 'data', 'ml.json')) as f:
+        dataset = json.load(f)
+    sources = {}
+    for key, value in dataset.items():
+        sources.setdefault(key.split('.')[0] if '.' in key else 'base', {})[key] = value
+
+    directory = tempfile.mkdtemp()
+    try:
+        print('{} keywords in {} sources'.format(len(dataset), len(sources)))
+        print('{:>10} {:>8} {:>8} {:>7}'.format('run', 'time ms', 'shards', 'merged'))
+        for run in ('cold', 'unchanged', 'changed'):
+            if run == 'changed':
+                name = sorted(sources, key=lambda n: -len(sources[n]))[0]
+                sources[name]['{}.bench_new'.format(name)] = {'url': 'https://example.com/new'}
+            start = time.perf_counter()
+            shards, merged = publish(directory, sources)
+            elapsed = (time.perf_counter() - start) * 1000
+            print('{:>10} {:>8.1f} {:>8} {:>7}'.format(run, elapsed, len(shards.changed), str(merged)))
+
+            expected = {}
+            for data in sources.values():
+                expected.update(data)
+            with open(os.path.join(directory, 'ml.jsonl'), 'rb') as f:
+                assert decode(f.read()) == expected
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Load time and memory of the mmap keyword store vs. the pickled dict.
+
+The pickle is built from the checked-in ``data/ml.json``, the store from
+the same data in ``data/ml.jsonl``. Each load is
+followed by decoding 15 records, which is all a keystroke ever displays.
+
+* cold: first load in a fresh interpreter (includes page-cache misses
+  only if the OS evicted the file)
+* warm: repeated loads within one process
+* rss: peak resident memory of the fresh interpreter after the load,
+  minus that of an interpreter that loads nothing. For the store this is
+  mostly page cache mapped into the process, shared and reclaimable.
+
+    python benchmarks/bench_store.py
+"""
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mlformat  # noqa: E402
+from mlstore import KeywordStoreSerializer, build_store  # noqa: E402
+
+REPEAT = 20
+
+PROBE = '''
+import pickle, resource, sys, time
+sys.path.insert(0, {root!r})
+from mlstore import KeywordStoreSerializer
+start = time.perf_counter()
+if {kind!r} == 'pickle':
+    with open({path!r}, 'rb') as fp:
+        data, assets = pickle.load(fp)
+    keys = list(data)[:15]
+    shown = [(k, data[k]['url'], data[k].get('desc')) for k in keys]
+elif {kind!r} == 'mlstore':
+    with open({path!r}, 'rb') as fp:
+        store = KeywordStoreSerializer.load(fp)
+    shown = [(store.keys[i], store.url(i), store.descs[i]) for i in range(15)]
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def load_pickle(path):
+    with open(path, 'rb') as fp:
+        data, _ = pickle.load(fp)
+    return [(k, data[k]['url'], data[k].get('desc')) for k in list(data)[:15]]
+
+
+def load_store(path):
+    with open(path, 'rb') as fp:
+        store = KeywordStoreSerializer.load(fp)
+    return [(store.keys[i], store.url(i), store.descs[i]) for i in range(15)]
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def cold(kind, path):
+    times, rss = [], []
+    for _ in range(5):
+        out = subprocess.check_output([sys.executable, '-c', PROBE.format(
+            root=ROOT, kind=kind, path=path)])
+        ms, maxrss = out.split()
+        times.append(float(ms))
+        rss.append(int(maxrss))
+    return median(times), median(rss)
+
+
+def warm(loader, path):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        loader(path)
+        times.append((time.perf_counter() - start) * 1000)
+    return median(times)
+
+
+def build(pickle_path, store_path):
+    with open(os.path.join(ROOT, 'data', 'ml.json')) as f:
+        data = json.load(f)
+    with open(pickle_path, 'wb') as fp:
+        pickle.dump((data, {}), fp, protocol=-1)
+    with open(os.path.join(ROOT, 'data', 'ml.jsonl'), encoding='utf-8') as f:
+        header, records = mlformat.load(f)
+        store = build_store(header['bases'], records)
+    with open(store_path, 'wb') as fp:
+        KeywordStoreSerializer.dump(store, fp)
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    pickle_path = os.path.join(tmp, 'data.pickle')
+    store_path = os.path.join(tmp, 'data.mlstore')
+    # build in a child: peak RSS is inherited by the probes this process spawns
+    subprocess.check_call([sys.executable, __file__, '--build', pickle_path, store_path])
+
+    _, base_rss = cold('none', store_path)
+    print('{:>8} {:>10} {:>10} {:>10} {:>12}'.format(
+        'format', 'size KB', 'cold ms', 'warm ms', 'rss KB'))
+    for kind, path, loader in (('pickle', pickle_path, load_pickle),
+                               ('mlstore', store_path, load_store)):
+        cold_ms, rss = cold(kind, path)
+        print('{:>8} {:>10.0f} {:>10.2f} {:>10.2f} {:>12}'.format(
+            kind, os.path.getsize(path) / 1024.0, cold_ms, warm(loader, path),
+            rss - base_rss))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--build']:
+        build(*sys.argv[2:])
+    else:
+        main()
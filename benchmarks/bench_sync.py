@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Dataset refresh: shard deltas vs. downloading the whole dataset.
+
+The checked-in ``data/ml.json`` is published to a temporary directory
+the way the crawler publishes it: ``ml.jsonl`` plus one shard per source
+(split by the first component of the keywords here) and the shard
+manifest. A local file server stands in for GitHub, and the client's
+refresh runs against it:
+
+* full: ``ml.jsonl`` in one piece, what every refresh used to download
+* cold: no local shards yet
+* unchanged: nothing was published since the last refresh
+* changed: one source was published again with a new keyword
+
+Every refresh is checked against the published ``ml.jsonl``.
+
+    python benchmarks/bench_sync.py
+"""
+import functools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'crawler'))
+# the vendored requests, like mldocs.py
+sys.path.append(os.path.join(ROOT, 'libs'))
+
+import mlformat  # noqa: E402
+import mlsync  # noqa: E402
+from libs import requests  # noqa: E402
+from shards import ShardSet, decode, encode  # noqa: E402
+
+
+class Handler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def publish(directory, sources):
+    # what crawler/generate_ml_keywords.py publishes
+    shards = ShardSet(os.path.join(directory, 'shards'))
+    for name, data in sources.items():
+        shards.update(name, data)
+    shards.save(list(sources))
+    with open(os.path.join(directory, 'ml.jsonl'), 'wb') as f:
+        f.write(encode(shards.merge(list(sources))))
+
+
+def as_dict(header, records):
+    bases = header['bases']
+    return {key: (mlformat.expand_url(bases[base_id], suffix, key), desc)
+            for key, base_id, suffix, desc in records}
+
+
+def main():
+    with open(os.path.join(ROOT, 'data', 'ml.json')) as f:
+        dataset = json.load(f)
+    sources = {}
+    for key, value in dataset.items():
+        sources.setdefault(key.split('.')[0] if '.' in key else 'base', {})[key] = value
+
+    published = tempfile.mkdtemp()
+    local = tempfile.mkdtemp()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=published))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    try:
+        publish(published, sources)
+        print('{} keywords in {} shards'.format(len(dataset), len(sources)))
+        print('{:>10} {:>8} {:>8} {:>10}'.format('refresh', 'time ms', 'shards', 'KB'))
+
+        start = time.perf_counter()
+        body = requests.get(base_url + 'ml.jsonl').content
+        header, records = mlformat.load(body.decode('utf-8').splitlines())
+        records = list(records)
+        print('{:>10} {:>8.1f} {:>8} {:>10.0f}'.format(
+            'full', (time.perf_counter() - start) * 1000, '-', len(body) / 1024.0))
+
+        for run in ('cold', 'unchanged', 'changed'):
+            if run == 'changed':
+                name = sorted(sources, key=lambda n: -len(sources[n]))[0]
+                sources[name]['{}.bench_new'.format(name)] = {'url': 'https://example.com/new'}
+                publish(published, sources)
+            start = time.perf_counter()
+            manifest, downloaded = mlsync.sync(local, base_url)
+            header, records = mlsync.load(local)
+            elapsed = (time.perf_counter() - start) * 1000
+            size = os.path.getsize(os.path.join(local, mlsync.MANIFEST))
+            size += sum(os.path.getsize(mlsync.shard_path(local, entry)) for entry in downloaded)
+            print('{:>10} {:>8.1f} {:>8} {:>10.0f}'.format(run, elapsed, len(downloaded), size / 1024.0))
+
+            with open(os.path.join(published, 'ml.jsonl'), 'rb') as f:
+                expected = decode(f.read())
+            assert as_dict(header, records) == {k: (v['url'], v.get('desc', '')) for k, v in expected.items()}
+            assert [r[0] for r in records] == list(expected)
+    finally:
+        server.shutdown()
+        shutil.rmtree(published, ignore_errors=True)
+        shutil.rmtree(local, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Ranking the matches of the worst-case (one and two character) queries.
+
+``sort`` is the full sort by ``search_priority_len`` the search used to
+do before keeping the first 15 results, ``rank`` is
+``KeywordStore.rank(ids, 15)``. Matching itself (``index.search``) is
+timed separately, as it is the same in both modes.
+
+    python benchmarks/bench_topk.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mlformat  # noqa: E402
+from mldocs import search_priority_len  # noqa: E402
+from mlstore import build_store  # noqa: E402
+
+QUERIES = ([], ['a'], ['e'], ['t'], ['.'], ['tf'], ['nn'], ['np'], ['to'], ['ke'], ['x'])
+LIMIT = 15
+REPEAT = 30
+
+
+def timeit(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    with open(os.path.join(ROOT, 'data', 'ml.jsonl'), encoding='utf-8') as f:
+        header, records = mlformat.load(f)
+        store = build_store(header['bases'], records, priority=search_priority_len)
+    keys = store.keys
+
+    def full_sort(ids):
+        return sorted(ids, key=lambda i: search_priority_len(keys[i]))[:LIMIT]
+
+    print('{:>6} {:>8} {:>10} {:>10} {:>10}'.format('query', 'matches', 'match ms', 'sort ms', 'rank ms'))
+    for query in QUERIES:
+        ids = store.index.search(query)
+        assert store.rank(ids, LIMIT) == full_sort(ids)
+        print('{:>6} {:>8} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+            ' '.join(query) or "''", len(ids),
+            timeit(lambda: store.index.search(query)),
+            timeit(lambda: full_sort(ids)),
+            timeit(lambda: store.rank(ids, LIMIT))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Concurrent HTTP fetching for the crawler.
+
+All requests go through one pooled ``requests.Session`` with retries and
+exponential backoff. A thread pool bounds the total number of requests in
+flight, and a semaphore per host keeps any single site from getting more
+than ``per_host`` of them. With an :class:`~httpcache.HTTPCache`, requests
+are conditional and unchanged pages are served from disk.
+"""
+import hashlib
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from httpcache import HTTPCache
+
+USER_AGENT = 'mldocs-crawler (+https://github.com/lsgrep/mldocs)'
+
+
+class Page:
+    """A fetched page.
+
+    ``not_modified`` pages are in the cache, their text is only read from
+    it when asked for.
+    """
+
+    def __init__(self, url: str, text: Optional[str] = None, cache: Optional[HTTPCache] = None):
+        self.url = url
+        self._text = text
+        self._cache = cache
+        self.not_modified = text is None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._cache.text(self.url)
+        return self._text
+
+
+class HostStats:
+    """Request count, failures, 304s, bytes and time spent fetching from one host."""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+
+    def add(self, seconds: float, size: int, failed: bool = False, not_modified: bool = False):
+        self.requests += 1
+        self.failures += failed
+        self.not_modified += not_modified
+        self.bytes += size
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+
+
+class Fetcher:
+    """Fetch pages concurrently with per-host limits.
+
+    Args:
+        workers: maximum number of requests in flight
+        per_host: maximum number of requests in flight to one host
+        retries: retries of failed connections and 429/5xx responses
+        backoff: backoff factor between retries, in seconds
+        timeout: connect and read timeout of each request, in seconds
+        cache: conditional-GET cache, none by default
+    """
+
+    def __init__(self, workers: int = 16, per_host: int = 4, retries: int = 3,
+                 backoff: float = 0.5, timeout: float = 30, cache: Optional[HTTPCache] = None):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers,
+                              max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch')
+        self.stats = defaultdict(HostStats)
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def get(self, url: str, headers=None) -> requests.Response:
+        """Fetch ``url``, waiting for a free slot of its host."""
+        host = urlsplit(url).netloc
+        with self._host_slot(host):
+            start = time.perf_counter()
+            try:
+                resp = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                with self._lock:
+                    self.stats[host].add(time.perf_counter() - start, 0, failed=True)
+                raise
+            not_modified = resp.status_code == 304
+            with self._lock:
+                self.stats[host].add(time.perf_counter() - start, len(resp.content),
+                                     failed=not (resp.ok or not_modified),
+                                     not_modified=not_modified)
+        return resp
+
+    def fetch(self, url: str) -> Page:
+        """Fetch ``url``, revalidating the cached copy if there is one.
+
+        Raises:
+            requests.HTTPError: the answer was neither ``200`` nor a ``304``
+                for the cached copy, e.g. a 404 or a 5xx left after retrying
+        """
+        if self.cache is None:
+            resp = self.get(url)
+        else:
+            resp = self.get(url, headers=self.cache.validators(url))
+            if resp.status_code == 304:
+                return Page(url, cache=self.cache)
+        if resp.status_code != 200:
+            raise requests.HTTPError(f'{resp.status_code} {resp.reason} for url: {url}',
+                                     response=resp)
+        if self.cache is not None:
+            self.cache.store(url, resp.headers, resp.content, resp.encoding or resp.apparent_encoding)
+        return Page(url, resp.text)
+
+    def text(self, url: str) -> str:
+        """Fetch ``url`` and return its body as text."""
+        return self.fetch(url).text
+
+    def map(self, urls: Iterable[str], func: Optional[Callable[[str], object]] = None,
+            errors: bool = False) -> List[object]:
+        """Fetch ``urls`` concurrently, results in the same order.
+
+        Args:
+            urls: pages to fetch
+            func: fetch function, :meth:`text` by default
+            errors: return the exception of a failed fetch instead of
+                raising it
+
+        Returns:
+            list of page texts (or ``func`` results)
+        """
+        func = func or self.text
+        futures = [self.executor.submit(func, url) for url in urls]
+        if not errors:
+            return [future.result() for future in futures]
+        return [future.exception() or future.result() for future in futures]
+
+    def report(self) -> str:
+        """Per-host timings and the total crawl time as a table."""
+        lines = ['{:<32} {:>6} {:>6} {:>6} {:>10} {:>9} {:>9}'.format(
+            'host', 'reqs', 'fails', '304s', 'KB', 'total s', 'max s')]
+        for host, stats in sorted(self.stats.items(), key=lambda item: -item[1].seconds):
+            lines.append('{:<32} {:>6} {:>6} {:>6} {:>10.0f} {:>9.2f} {:>9.2f}'.format(
+                host, stats.requests, stats.failures, stats.not_modified,
+                stats.bytes / 1024.0, stats.seconds, stats.slowest))
+        lines.append('crawl time: {:.2f} s'.format(time.perf_counter() - self.started))
+        return '\n'.join(lines)
+
+
+@lru_cache(maxsize=None)
+def source_digest(module_name: str) -> str:
+    """SHA-1 of the source of a module and of the modules next to it it uses.
+
+    That's the parser's own code with its constants, the globals it reads
+    and helpers like :func:`htmlscan.scan`.
+    """
+    module = sys.modules[module_name]
+    directory = os.path.dirname(os.path.abspath(module.__file__))
+    paths = {os.path.abspath(module.__file__)}
+    for value in list(vars(module).values()):
+        used = inspect.getmodule(value)
+        path = getattr(used, '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == directory:
+            paths.add(os.path.abspath(path))
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def parser_key(parse, args) -> str:
+    """Name of the cached results of ``parse(page, url, *args)``.
+
+    Changes with the source of the parser's module and the crawler modules
+    it uses, so editing a parser or its helpers re-parses every page.
+    """
+    source = f'{source_digest(parse.__module__)} {parse.__qualname__} {args!r}'
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()
+    return f'{parse.__name__}-{digest[:12]}'
+
+
+def fetch_parse(fetcher: Fetcher, parsers: Executor, url: str, parse, *args) -> Future:
+    """Fetch ``url`` in the fetcher's threads, then parse it in the process pool.
+
+    Pages the server reports as not modified aren't parsed again if the
+    result of parsing them is cached.
+
+    Returns:
+        Future of ``parse(page, url, *args)``
+    """
+    result = Future()
+    cache = fetcher.cache
+    key = parser_key(parse, args)
+
+    # an exception in a done callback is only logged, it has to complete
+    # ``result`` or whoever waits for it would wait forever
+    def parsed(future):
+        try:
+            if cache is not None:
+                cache.store_parsed(url, key, future.result())
+            result.set_result(future.result())
+        except BaseException as e:
+            result.set_exception(e)
+
+    def fetched(future):
+        try:
+            page = future.result()
+            if page.not_modified:
+                cached = cache.parsed(url, key)
+                if cached is not None:
+                    result.set_result(cached)
+                    return
+            parsers.submit(parse, page.text, url, *args).add_done_callback(parsed)
+        except BaseException as e:
+            result.set_exception(e)
+
+    fetcher.executor.submit(fetcher.fetch, url).add_done_callback(fetched)
+    return result
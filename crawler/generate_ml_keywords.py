@@ -1,13 +1,32 @@
+import argparse
 import json
+import os
 import re
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-import requests
 import yaml
-from bs4 import BeautifulSoup
 
-data_dir = f'{str(Path(__file__).resolve().parent.parent)}/data'
+from fetcher import Fetcher, fetch_parse
+from htmlscan import scan
+from httpcache import HTTPCache
+
+root_dir = str(Path(__file__).resolve().parent.parent)
+data_dir = f'{root_dir}/data'
+
+sys.path.insert(0, root_dir)
+from shards import ShardSet, encode as encode_shard, sha1  # noqa: E402
+
+HF_DOMAIN = 'https://huggingface.co'
+HF_MAIN_CLASSES_URL = f'{HF_DOMAIN}/docs/transformers/main_classes/configuration'
+
+BASE_SHARD = 'base'
+# entries crawled before the dataset was split into shards
+LEGACY_SHARD = 'legacy'
 
 
 # TODO automate this process
@@ -18,10 +37,9 @@ def prepare_base_keywords():
     return data
 
 
-def parse_tf_docs(tf_doc_url=None, prefix='tf'):
+def parse_tf_docs(content, tf_doc_url, prefix='tf'):
     data = {}
     base_url = tf_doc_url.split('?')[0]
-    content = requests.get(tf_doc_url).text
     pattern = f"({base_url}/{prefix}/[a-zA-Z0-9_./#]+)"
     matches = re.findall(pattern, content, re.DOTALL)
     for link in matches:
@@ -59,13 +77,12 @@ def load_seed_file(file_name):
     return seed
 
 
-def parse_generated_docs(link, pattern=None):
+def parse_generated_docs(content, link, pattern=None):
     data = {}
     base_url = link[:link.rfind('/')]
-    resp = requests.get(link)
     if pattern is None:
         pattern = 'href="([a-zA-Z0-9_./#]+)"'
-    matches = re.findall(pattern, resp.text, re.DOTALL)
+    matches = re.findall(pattern, content, re.DOTALL)
     for href in matches:
         # generated urls tend to have package name and '#' mark included.
         # intentionally excluded __ functions
@@ -78,114 +95,100 @@ def parse_generated_docs(link, pattern=None):
     return data
 
 
-def parse_huggingface_main_classes() -> Dict[str, Any]:
-    """Parse Hugging Face Transformers main API classes documentation.
-    
+CLASS_HEADING = re.compile(r'class transformers\.(\w+)')
+
+
+def valid_section_id(section_id: str) -> bool:
+    return bool(section_id) and not section_id.startswith('_') and not section_id.endswith('_')
+
+
+def parse_huggingface_main_class_pages(content, url=None) -> List[str]:
+    """Parse the names of the Hugging Face Transformers main API class pages.
+
+    Args:
+        content: HTML of any main class page, they all have the sidebar
+        url: URL of the page (unused)
+
     Returns:
-        Dictionary mapping class names to their documentation URLs
+        Sorted page names
     """
-    data = {}
-    base_domain = 'https://huggingface.co'
-    
-    # Get main class pages from the API reference page
-    print('\nFetching main classes from API reference...')
-    resp = requests.get(f'{base_domain}/docs/transformers/main_classes/configuration')
-    soup = BeautifulSoup(resp.text, 'html.parser')
-    
-    # Find the sidebar navigation
-    main_class_pages = []
-    for link in soup.select('a'):
-        href = link.get('href', '')
+    # Find the main class links of the sidebar navigation
+    main_class_pages = set()
+    for link in scan(content, ['a'], text_tags=()):
+        href = link.attrs.get('href', '')
         if '/main_classes/' in href:
             page_name = href.split('/')[-1]
-            if page_name and page_name not in main_class_pages:
-                main_class_pages.append(page_name)
-    
-    # Remove duplicates and sort
-    main_class_pages = sorted(set(main_class_pages))
-    
+            if page_name:
+                main_class_pages.add(page_name)
+    main_class_pages = sorted(main_class_pages)
+
     print(f'\nFound main class pages: {main_class_pages}')
     print(f'Processing {len(main_class_pages)} main class pages...')
-    
-    # Process each main class page
-    for page in main_class_pages:
-        page_url = f'{base_domain}/docs/transformers/main_classes/{page}'
-        
-        try:
-            resp = requests.get(page_url)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            # Find all class sections (h2 and h3 headers)
-            class_sections = soup.find_all(['h2', 'h3'])
-            current_class = None
-            
-            # Track links for summary
-            page_links = set()
-            page_classes = set()
-            
-            # Process all links first
-            for a in soup.find_all('a'):
-                href = a.get('href', '')
-                if href and '#transformers.' in href:
-                    page_links.add(href)
-            
-            # Process class sections
-            for section in class_sections:
-                # Look for class name in the text
-                class_match = re.search(r'class transformers\.(\w+)', section.text)
-                if class_match:
-                    current_class = class_match.group(1)
-                    class_key = f'transformers.{current_class}'
-                    page_classes.add(class_key)
-                    
-                    data[class_key] = {
-                        'url': f'{page_url}#transformers.{current_class}'
-                    }
-                    continue
-                
-                section_id = section.get('id', '')
-                if not section_id or section_id.startswith('_') or section_id.endswith('_'):
-                    continue
-                
-                # If we're in a class context, this might be a method
-                if current_class:
-                    method_key = f'transformers.{current_class}.{section_id}'
-                    data[method_key] = {
-                        'url': f'{page_url}#transformers.{current_class}.{section_id}'
-                    }
-            
-            # Print summary for this page
-            print(f'\n{page.upper()}:')
-            if page_classes:
-                print(f'  Classes ({len(page_classes)}): {sorted(page_classes)}')
-            print(f'  Total links: {len(page_links)}')
-            
-        except Exception as e:
-            print(f'Error processing {page_url}: {str(e)}')
+    return main_class_pages
+
+
+def parse_huggingface_main_class(content, page_url) -> Dict[str, Any]:
+    """Parse one Hugging Face Transformers main API class page.
+
+    Returns:
+        Dictionary mapping class names to their documentation URLs
+    """
+    data = {}
+    page = page_url.split('/')[-1]
+    current_class = None
+
+    # Track links for summary
+    page_links = set()
+    page_classes = set()
+
+    for element in scan(content, ['a', 'h2', 'h3'], text_tags=['h2', 'h3']):
+        if element.name == 'a':
+            href = element.attrs.get('href', '')
+            if '#transformers.' in href:
+                page_links.add(href)
+            continue
+
+        # Look for class name in the text of class sections (h2 and h3 headers)
+        class_match = CLASS_HEADING.search(element.text)
+        if class_match:
+            current_class = class_match.group(1)
+            class_key = f'transformers.{current_class}'
+            page_classes.add(class_key)
+            data[class_key] = {
+                'url': f'{page_url}#transformers.{current_class}'
+            }
             continue
-    
+
+        # If we're in a class context, this might be a method
+        section_id = element.attrs.get('id', '')
+        if current_class and valid_section_id(section_id):
+            method_key = f'transformers.{current_class}.{section_id}'
+            data[method_key] = {
+                'url': f'{page_url}#transformers.{current_class}.{section_id}'
+            }
+
+    # Print summary for this page
+    print(f'\n{page.upper()}:')
+    if page_classes:
+        print(f'  Classes ({len(page_classes)}): {sorted(page_classes)}')
+    print(f'  Total links: {len(page_links)}')
     return data
 
-def parse_huggingface_docs(base_url: str, test_mode: bool = False) -> Dict[str, Any]:
-    """Parse Hugging Face Transformers documentation.
-    
+
+def parse_huggingface_model_links(content, base_url: str, test_mode: bool = False) -> List[str]:
+    """Parse the model documentation links of the Hugging Face Transformers docs.
+
     Args:
+        content: HTML of the documentation main page
         base_url: The base URL of the Hugging Face documentation
-        
+
     Returns:
-        Dictionary mapping function/class names to their documentation URLs
+        URLs of the model documentation pages
     """
-    data = {}
-    base_domain = 'https://huggingface.co'
-    
-    # Get the main page content
-    resp = requests.get(base_url)
-    soup = BeautifulSoup(resp.text, 'html.parser')
-    
     # Find all model documentation links
     model_links = []
-    for link in soup.find_all('a'):
-        href = link.get('href')
+    for link in scan(content, ['a'], text_tags=()):
+        href = link.attrs.get('href')
         if href and 'model_doc' in href:
             # Handle both absolute and relative URLs
             if href.startswith('http'):
@@ -195,167 +198,238 @@ def parse_huggingface_docs(base_url: str, test_mode: bool = False) -> Dict[str,
             else:
                 # Handle relative paths
                 if href.startswith('/'):
-                    full_url = f'{base_domain}{href}'
+                    full_url = f'{HF_DOMAIN}{href}'
                 else:
                     # Construct URL relative to the docs base path
                     docs_base = '/'.join(base_url.split('/')[:-1])
                     full_url = f'{docs_base}/{href}'
             model_links.append(full_url)
-    
+
     # For testing, only process ZoeDepth
     if test_mode:
         model_links = ['https://huggingface.co/docs/transformers/model_doc/zoedepth']
-    
-    # Process each model's documentation
-    for model_url in model_links:
+
+    print('Found model links:', len(model_links))
+    return model_links
+
+
+def parse_huggingface_model_doc(content, model_url: str) -> Dict[str, Any]:
+    """Parse one Hugging Face Transformers model documentation page.
+
+    The page is scanned once: h2/h3 headers are classes (or sections with
+    an id, under a class), h4/h5 headers under such a section are its
+    methods. A section is described by the paragraph after its header, a
+    method by the paragraphs and list items up to the next header.
+
+    Returns:
+        Dictionary mapping function/class names to their documentation URLs
+    """
+    data = {}
+    print(f'Processing {model_url}')
+
+    # Extract model name from URL
+    model_name = model_url.split('/')[-1].replace('-', '_')
+
+    # Add the main model entry
+    model_key = f'transformers.{model_name}'
+    print(f'Adding model entry: {model_key}')
+    data[model_key] = {
+        'url': model_url
+    }
+
+    current_class = None
+    # id'd section whose methods are being collected, and the current method
+    section_key = None
+    method = None
+    methods = []
+    # sections waiting for their description
+    undescribed = []
+
+    for element in scan(content, ['h2', 'h3', 'h4', 'h5', 'p', 'ul', 'li'],
+                        text_tags=['h2', 'h3', 'p', 'li']):
+        name = element.name
+        if name in ('h2', 'h3'):
+            section_key = method = None
+            # Look for the class name in the text
+            class_match = CLASS_HEADING.search(element.text)
+            if class_match:
+                current_class = class_match.group(1)
+                class_key = f'transformers.{model_name}.{current_class}'
+                print(f'Found class: {class_key}')
+                data[class_key] = {
+                    'url': f'{model_url}#transformers.{current_class}'
+                }
+                continue
+
+            # If we're in a class context, this section is a class too
+            section_id = element.attrs.get('id', '')
+            if current_class and valid_section_id(section_id):
+                current_class = section_id
+                section_key = f'transformers.{model_name}.{current_class}'
+                print(f'Found class: {section_key}')
+                data[section_key] = {
+                    'url': f'{model_url}#{section_id}',
+                    'desc': ''
+                }
+                undescribed.append(data[section_key])
+
+        elif name in ('h4', 'h5'):
+            method = None
+            method_id = element.attrs.get('id', '')
+            if section_key and method_id and not method_id.startswith('_'):
+                # Method description and parameters follow
+                method = data[f'{section_key}.{method_id}'] = {
+                    'url': f'{model_url}#{method_id}',
+                    'desc': '',
+                    'params': []
+                }
+                methods.append(method)
+
+        elif name == 'p':
+            for section in undescribed:
+                section['desc'] = element.text
+            undescribed = []
+            if method is not None:
+                method['desc'] += element.text + ' '
+
+        elif name == 'li' and method is not None and 'ul' in element.inside:
+            method['params'].append(element.text)
+
+    for method in methods:
+        method['desc'] = method['desc'].strip()
+    return data
+
+
+def results(jobs: List[Future], urls: List[str]):
+    """Yield the results of ``jobs`` in order, reporting and skipping failed pages."""
+    for url, job in zip(urls, jobs):
         try:
-            print(f'Processing {model_url}')
-            print('Found model links:', len(model_links))
-            model_resp = requests.get(model_url)
-            model_soup = BeautifulSoup(model_resp.text, 'html.parser')
-            
-            # Extract model name from URL
-            model_name = model_url.split('/')[-1].replace('-', '_')
-            
-            # Add the main model entry
-            model_key = f'transformers.{model_name}'
-            print(f'Adding model entry: {model_key}')
-            data[model_key] = {
-                'url': model_url
-            }
-            
-            # Find all class definitions (h2 and h3 headers)
-            class_sections = model_soup.find_all(['h2', 'h3'])
-            current_class = None
-            
-            for section in class_sections:
-                # Look for the class name in the text
-                class_match = re.search(r'class transformers\.([\w]+)', section.text)
-                if class_match:
-                    current_class = class_match.group(1)
-                    class_key = f'transformers.{model_name}.{current_class}'
-                    print(f'Found class: {class_key}')
-                    
-                    data[class_key] = {
-                        'url': f'{model_url}#transformers.{current_class.split(".")[-1]}'
-                    }
-                    continue
-                
-                section_id = section.get('id', '')
-                if not section_id or section_id.startswith('_') or section_id.endswith('_'):
-                    continue
-                
-                # If we're in a class context, this might be a method
-                if current_class:
-                    current_class = section_id
-                    class_key = f'transformers.{model_name}.{current_class}'
-                    print(f'Found class: {class_key}')
-                    
-                    # Get class description
-                    desc = ''
-                    next_p = section.find_next('p')
-                    if next_p:
-                        desc = next_p.text
-                    
-                    data[class_key] = {
-                        'url': f'{model_url}#{section_id}',
-                        'desc': desc
-                    }
-                    
-                    # Find and add all methods in this class
-                    method_sections = section.find_next(['h4', 'h5'])
-                    while method_sections and method_sections.find_previous(['h2', 'h3']) == section:
-                        method_id = method_sections.get('id', '')
-                        if method_id and not method_id.startswith('_'):
-                            method_key = f'{class_key}.{method_id}'
-                            
-                            # Get method description and parameters
-                            desc = ''
-                            params = []
-                            next_elem = method_sections.find_next(['p', 'ul'])
-                            while next_elem and next_elem.name in ['p', 'ul']:
-                                if next_elem.name == 'p':
-                                    desc += next_elem.text + ' '
-                                elif next_elem.name == 'ul':
-                                    for li in next_elem.find_all('li'):
-                                        params.append(li.text)
-                                next_elem = next_elem.find_next(['p', 'ul'])
-                            
-                            data[method_key] = {
-                                'url': f'{model_url}#{method_id}',
-                                'desc': desc.strip(),
-                                'params': params
-                            }
-                        
-                        method_sections = method_sections.find_next(['h4', 'h5'])
-                
-                # If we're in a class context, this might be a method
-                elif current_class:
-                    method_key = f'transformers.{model_name}.{current_class}.{section_id}'
-                    
-                    data[method_key] = {
-                        'url': f'{model_url}#transformers.{current_class.split(".")[-1]}.{section_id}'
-                    }
-        
+            yield job.result()
         except Exception as e:
-            print(f'Error processing {model_url}: {str(e)}')
-            continue
-    
+            print(f'Error processing {url}: {str(e)}')
+
+
+def transformers_data(model_jobs, model_links, page_jobs, page_urls):
+    """Merge the Hugging Face Transformers model and main class pages."""
+    print('Processing Hugging Face Transformers documentation...')
+    data = {}
+    for model_data in results(model_jobs, model_links):
+        data.update(model_data)
+    print(f'Crawled model data keys: {list(data.keys())}')
+
+    print('\nProcessing Hugging Face main API classes...')
+    main_classes = {}
+    for page_data in results(page_jobs, page_urls):
+        main_classes.update(page_data)
+    print('\nMain API Classes found:')
+    for key, value in main_classes.items():
+        print(f'  {key} -> {value["url"]}')
+    data.update(main_classes)
     return data
 
 
 if __name__ == '__main__':
-    # Load existing data if it exists
+    parser = argparse.ArgumentParser(description='Crawl the API docs listed in data/seed.yaml')
+    parser.add_argument('--workers', type=int, default=16, help='requests in flight')
+    parser.add_argument('--per-host', type=int, default=4, help='requests in flight per host')
+    parser.add_argument('--parsers', type=int, default=None, help='parser processes')
+    parser.add_argument('--cache-dir', default=f'{root_dir}/crawler/.http-cache',
+                        help='conditional-GET cache of pages and parse results')
+    parser.add_argument('--no-cache', action='store_true', help='fetch and parse every page')
+    parser.add_argument('--merge-only', action='store_true',
+                        help="don't crawl, merge the shards (and data/base.json) into the dataset")
+    args = parser.parse_args()
+
     doc_file = f'{data_dir}/ml.json'
-    try:
+    compact_file = f'{data_dir}/ml.jsonl'
+    shards = ShardSet(f'{data_dir}/shards')
+    if not shards.exists and os.path.exists(doc_file):
+        # keep what was crawled before there were shards, sources override it
         with open(doc_file, 'r') as f:
-            data = json.load(f)
-        print(f'Loaded {len(data)} existing entries')
-    except FileNotFoundError:
-        data = {}
-    
-    # Add base keywords if not present
-    base_data = prepare_base_keywords()
-    for key, value in base_data.items():
-        if key not in data:
-            data[key] = value
-    
+            shards.update(LEGACY_SHARD, json.load(f))
+        print(f'Kept {shards.entries[LEGACY_SHARD]["count"]} existing entries in the {LEGACY_SHARD} shard')
+    shards.update(BASE_SHARD, prepare_base_keywords())
+
     seed_file = f'{data_dir}/seed.yaml'
     seed = load_seed_file(seed_file)
-    
-    # Process TensorFlow docs
-    for tensorflow_doc in seed['tensorflow']:
-        print(f'processing: {tensorflow_doc["name"]}')
-        crawled = parse_tf_docs(tensorflow_doc['url'], tensorflow_doc['prefix'])
-        data.update(crawled)
-    
-    # Process generated docs
-    for api_doc in seed['generated']:
-        print(f'processing: {api_doc["name"]}')
-        doc_url = api_doc['url']
-        
-        # Special handling for Hugging Face Transformers
-        if api_doc['name'] == 'transformers':
-            print('Processing Hugging Face Transformers documentation...')
-            crawled = parse_huggingface_docs(doc_url, test_mode=False)
-            print(f'Crawled model data keys: {list(crawled.keys())}')
-            # Preserve Hugging Face model entries
-            for key, value in crawled.items():
-                data[key] = value
-                
-            print('\nProcessing Hugging Face main API classes...')
-            main_classes = parse_huggingface_main_classes()
-            print('\nMain API Classes found:')
-            for key, value in main_classes.items():
-                print(f'  {key} -> {value["url"]}')
-            # Add main API class entries
-            for key, value in main_classes.items():
-                data[key] = value
-        else:
-            data.update(parse_generated_docs(doc_url))
-
-    print(f'Writing {len(data)} entries to {doc_file}')
-    print('Sample keys:', list(data.keys())[:5], '...')
-    print('Hugging Face keys:', [k for k in data.keys() if k.startswith('transformers.')])
-    with open(doc_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    sources = [doc['name'] for doc in seed['tensorflow'] + seed['generated']]
+    aliases = seed.get('aliases', {})
+    # base keywords first and sources in seed order, like data.update() used to
+    order = [BASE_SHARD, LEGACY_SHARD] + sources
+
+    # every page is fetched and parsed concurrently, each source is written
+    # to its shard in seed order once its pages are in
+    failed = []
+    started = time.perf_counter()
+    cache = None if args.no_cache or args.merge_only else HTTPCache(args.cache_dir)
+    with Fetcher(workers=args.workers, per_host=args.per_host, cache=cache) as fetcher, \
+            ProcessPoolExecutor(max_workers=args.parsers) as parsers:
+        jobs = {}
+        for doc in ([] if args.merge_only else seed['tensorflow']):
+            jobs[doc['name']] = fetch_parse(fetcher, parsers, doc['url'], parse_tf_docs, doc['prefix']).result
+        for api_doc in ([] if args.merge_only else seed['generated']):
+            name = api_doc['name']
+            if name != 'transformers':
+                jobs[name] = fetch_parse(fetcher, parsers, api_doc['url'], parse_generated_docs).result
+                continue
+            # Special handling for Hugging Face Transformers
+            links_job = fetch_parse(fetcher, parsers, api_doc['url'], parse_huggingface_model_links)
+            pages_job = fetch_parse(fetcher, parsers, HF_MAIN_CLASSES_URL,
+                                    parse_huggingface_main_class_pages)
+            try:
+                model_links = links_job.result()
+                page_urls = [f'{HF_DOMAIN}/docs/transformers/main_classes/{page}'
+                             for page in pages_job.result()]
+            except Exception as e:
+                failure = Future()
+                failure.set_exception(e)
+                jobs[name] = failure.result
+                continue
+            jobs[name] = partial(
+                transformers_data,
+                [fetch_parse(fetcher, parsers, url, parse_huggingface_model_doc) for url in model_links],
+                model_links,
+                [fetch_parse(fetcher, parsers, url, parse_huggingface_main_class) for url in page_urls],
+                page_urls)
+
+        for name, job in jobs.items():
+            print(f'processing: {name}')
+            try:
+                source = job()
+            except Exception as e:
+                print(f'Error processing {name}: {str(e)}, keeping its previous shard')
+                failed.append(name)
+                continue
+            changed = shards.update(name, source)
+            print(f'{name}: {len(source)} entries, {"updated" if changed else "unchanged"}')
+
+        if jobs:
+            print(fetcher.report())
+    print(f'crawl + parse time: {time.perf_counter() - started:.2f} s')
+    shards.save(order)
+
+    if shards.stale(compact_file) or shards.aliases != aliases:
+        data = shards.merge(order)
+        print(f'Merged shards {sorted(shards.changed)} and the rest into {len(data)} entries')
+        print('Hugging Face keys:', sum(k.startswith('transformers.') for k in data))
+        unused = sorted(alias for alias, name in aliases.items()
+                        if not any(name in key.lower() for key in data))
+        if unused:
+            print(f'Aliases standing for nothing in the data, mldocs ignores them: {", ".join(unused)}')
+        print(f'Writing {doc_file}')
+        with open(doc_file, 'w') as f:
+            json.dump(data, f, indent=2)
+
+        # compact dataset with interned base URLs, this is what mldocs downloads
+        print(f'Writing compact dataset to {compact_file}')
+        body = encode_shard(data, aliases)
+        with open(compact_file, 'wb') as f:
+            f.write(body)
+        shards.dataset = {'sha1': sha1(body), 'count': len(data)}
+        shards.aliases = aliases
+        shards.save(order)
+    else:
+        print('No shard changed, the dataset is up to date')
+
+    if failed:
+        sys.exit(f'Failed sources: {", ".join(failed)}')
@@ -0,0 +1,119 @@
+"""Single-pass extraction of elements from HTML pages.
+
+:func:`scan` runs :class:`html.parser.HTMLParser` over a page once and
+returns the elements of interest (say ``h2``, ``h3``, ``p`` and ``a``) in
+document order, with their attributes and text. Parsers then make one
+linear pass over that list instead of walking a whole document tree back
+and forth.
+
+Elements are closed the way BeautifulSoup's ``html.parser`` builder closes
+them: an end tag closes the innermost open element of that name and every
+element opened inside it, void elements (``<br>``, ``<img>``, ...) never
+stay open, and the text of ``<script>`` and ``<style>`` isn't text.
+"""
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr'))
+NOT_TEXT = frozenset(('script', 'style'))
+
+
+class Element:
+    """An element of interest.
+
+    Args:
+        name: tag name
+        attrs: attributes, valueless ones are empty strings
+        inside: names of the elements of interest it is nested in,
+            outermost first
+    """
+
+    __slots__ = ('name', 'attrs', 'inside', '_parts', '_text')
+
+    def __init__(self, name: str, attrs: Dict[str, str], inside: Tuple[str, ...]):
+        self.name = name
+        self.attrs = attrs
+        self.inside = inside
+        self._parts = []
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        """All the text inside the element."""
+        if self._text is None:
+            self._text = ''.join(self._parts)
+            self._parts = None
+        return self._text
+
+    def __repr__(self):
+        return f'<{self.name} {self.attrs!r}>'
+
+
+class ElementScanner(HTMLParser):
+    """Collect the elements named in ``tags``, see :func:`scan`."""
+
+    def __init__(self, tags: Iterable[str], text_tags: Optional[Iterable[str]] = None):
+        super().__init__()
+        self.tags = frozenset(tags)
+        self.text_tags = self.tags if text_tags is None else frozenset(text_tags)
+        self.elements = []
+        # every open element as (name, Element or None)
+        self._open = []
+        # open elements whose text is collected
+        self._capturing = []
+        self._not_text = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            if tag in self.tags:
+                self.elements.append(Element(tag, {k: v or '' for k, v in attrs}, self._inside()))
+            return
+        element = None
+        if tag in self.tags:
+            element = Element(tag, {k: v or '' for k, v in attrs}, self._inside())
+            self.elements.append(element)
+            if tag in self.text_tags:
+                self._capturing.append(element)
+        self._open.append((tag, element))
+        self._not_text += tag in NOT_TEXT
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._open) - 1, -1, -1):
+            if self._open[i][0] == tag:
+                break
+        else:
+            return
+        for name, element in self._open[i:]:
+            self._not_text -= name in NOT_TEXT
+            if element is not None and element.name in self.text_tags:
+                self._capturing.remove(element)
+        del self._open[i:]
+
+    def handle_data(self, data):
+        if self._not_text:
+            return
+        for element in self._capturing:
+            element._parts.append(data)
+
+    def _inside(self) -> Tuple[str, ...]:
+        return tuple(element.name for _, element in self._open if element is not None)
+
+
+def scan(content: str, tags: Iterable[str], text_tags: Optional[Iterable[str]] = None) -> List[Element]:
+    """Elements of ``content`` named in ``tags``, in document order.
+
+    Args:
+        content: HTML page
+        tags: names of the elements of interest
+        text_tags: those of ``tags`` whose text is needed, all of them by
+            default
+
+    Returns:
+        list of :class:`Element`
+    """
+    scanner = ElementScanner(tags, text_tags)
+    scanner.feed(content)
+    scanner.close()
+    return scanner.elements
@@ -0,0 +1,121 @@
+"""On-disk conditional-GET cache for the crawler.
+
+Every fetched page is stored with its ``ETag`` and ``Last-Modified``
+validators. The next request for it sends them back as ``If-None-Match``
+and ``If-Modified-Since``, and a ``304 Not Modified`` answer is served
+from disk. Parse results are cached next to the page too, so a page that
+didn't change isn't parsed again either.
+
+Layout, one set of files per URL (named after the SHA-1 of the URL)::
+
+    <key>.json           url and validators
+    <key>.body           page body
+    <key>.<parser>.json  result of parsing the page with <parser>, along
+                         with the validators of the page it was parsed from
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+
+def atomic_write(path: str, data: bytes):
+    """Write ``data`` to ``path`` through a temporary file, so that it's
+    either there in full or not at all."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class HTTPCache:
+    """Pages, validators and parse results kept in ``directory``."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str, suffix: str) -> str:
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{key}.{suffix}')
+
+    def _entry(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(url, 'json'), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or not os.path.exists(self._path(url, 'body')):
+            return None
+        return entry
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for ``url``, empty if it isn't cached."""
+        entry = self._entry(url)
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def body(self, url: str) -> bytes:
+        """Cached body of ``url``."""
+        with open(self._path(url, 'body'), 'rb') as f:
+            return f.read()
+
+    def text(self, url: str) -> str:
+        """Cached body of ``url``, decoded."""
+        entry = self._entry(url) or {}
+        return self.body(url).decode(entry.get('encoding') or 'utf-8', errors='replace')
+
+    def store(self, url: str, headers, body: bytes, encoding: Optional[str] = None):
+        """Cache the ``200`` response of ``url``.
+
+        Responses without validators can't be revalidated and aren't kept.
+        """
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        if not etag and not last_modified:
+            self.delete(url)
+            return
+        atomic_write(self._path(url, 'body'), body)
+        atomic_write(self._path(url, 'json'), json.dumps(
+            {'url': url, 'etag': etag, 'last_modified': last_modified,
+             'encoding': encoding}).encode('utf-8'))
+
+    def delete(self, url: str):
+        """Forget ``url``, parse results become stale with it."""
+        for suffix in ('json', 'body'):
+            try:
+                os.unlink(self._path(url, suffix))
+            except FileNotFoundError:
+                pass
+
+    def parsed(self, url: str, parser: str) -> Optional[Any]:
+        """Result of ``parser`` for the cached version of ``url`` or ``None``."""
+        entry = self._entry(url)
+        if entry is None:
+            return None
+        try:
+            with open(self._path(url, f'{parser}.json'), 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # parsed from another version of the page
+        if cached.get('page') != entry:
+            return None
+        return cached.get('result')
+
+    def store_parsed(self, url: str, parser: str, result: Any):
+        """Cache the result of ``parser`` for the cached version of ``url``."""
+        entry = self._entry(url)
+        if entry is not None:
+            atomic_write(self._path(url, f'{parser}.json'),
+                          json.dumps({'page': entry, 'result': result}).encode('utf-8'))
@@ -0,0 +1,147 @@
+"""Per-source shards of the dataset.
+
+Every seed source (``tensorflow``, ``tfds``, ``pytorch``, ...) is kept in
+its own shard, ``data/shards/<name>.jsonl``, in the compact format of
+:mod:`mlformat`. ``data/shards/manifest.json`` lists the shards in merge
+order with the SHA-1 and keyword count of each one, the SHA-1 of the
+dataset they were merged into and the query aliases of the dataset::
+
+    {"format": "mldocs-shards", "version": 1,
+     "shards": [{"name": "base", "file": "base.jsonl", "sha1": "...", "count": 6}, ...],
+     "dataset": {"sha1": "...", "count": 23237},
+     "aliases": {"np": "numpy", ...}}
+
+A shard is only rewritten when its content changed, and the dataset is
+only merged again when a shard changed. Merging is deterministic: shards
+are applied in manifest order, a keyword keeps the position of its first
+occurrence and the value of its last one.
+"""
+import hashlib
+import io
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import mlformat
+from httpcache import atomic_write
+
+FORMAT = 'mldocs-shards'
+VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def encode(data: Dict[str, Dict[str, Any]], aliases: Optional[Dict[str, str]] = None) -> bytes:
+    """``data`` in the compact dataset format, with ``aliases`` in its header."""
+    out = io.StringIO()
+    mlformat.dump(data, out, aliases)
+    return out.getvalue().encode('utf-8')
+
+
+def decode(body: bytes) -> Dict[str, Dict[str, Any]]:
+    """Inverse of :func:`encode`."""
+    # not splitlines(), descriptions can hold a raw U+2028, \x0c and the like
+    header, records = mlformat.load(body.decode('utf-8').split('\n'))
+    bases = header['bases']
+    data = {}
+    for key, base_id, suffix, desc in records:
+        value = {'url': mlformat.expand_url(bases[base_id], suffix, key)}
+        if desc:
+            value['desc'] = desc
+        data[key] = value
+    return data
+
+
+def sha1(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+class ShardSet:
+    """The shards in ``directory`` and their manifest.
+
+    Args:
+        directory: where the shards and the manifest are kept
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.changed = set()
+        try:
+            with open(self._path(MANIFEST), 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        if manifest and (manifest.get('format'), manifest.get('version')) != (FORMAT, VERSION):
+            raise ValueError(f'unsupported shard manifest: {self._path(MANIFEST)}')
+        self.exists = bool(manifest)
+        self.entries = {entry['name']: entry for entry in manifest.get('shards', [])}
+        self.dataset = manifest.get('dataset', {})
+        self.aliases = manifest.get('aliases', {})
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def update(self, name: str, data: Dict[str, Dict[str, Any]]) -> bool:
+        """Replace shard ``name`` by ``data`` if its content changed.
+
+        Returns:
+            whether the shard changed
+        """
+        body = encode(data)
+        entry = {'name': name, 'file': f'{name}.jsonl', 'sha1': sha1(body), 'count': len(data)}
+        if self.entries.get(name) == entry and os.path.exists(self._path(entry['file'])):
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(self._path(entry['file']), body)
+        self.entries[name] = entry
+        self.changed.add(name)
+        return True
+
+    def read(self, name: str) -> Dict[str, Dict[str, Any]]:
+        """Content of shard ``name``, checked against its hash."""
+        entry = self.entries[name]
+        with open(self._path(entry['file']), 'rb') as f:
+            body = f.read()
+        if sha1(body) != entry['sha1']:
+            raise ValueError(f'shard {name} does not match its hash in the manifest')
+        return decode(body)
+
+    def save(self, order: List[str]):
+        """Write the manifest, with the shards in ``order``.
+
+        Shards that aren't in ``order`` any more are deleted.
+        """
+        for name in set(self.entries) - set(order):
+            self.changed.add(name)
+            try:
+                os.unlink(self._path(self.entries.pop(name)['file']))
+            except FileNotFoundError:
+                pass
+        manifest = {'format': FORMAT, 'version': VERSION,
+                    'shards': [self.entries[name] for name in order if name in self.entries],
+                    'dataset': self.dataset,
+                    'aliases': self.aliases}
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(self._path(MANIFEST),
+                      (json.dumps(manifest, indent=2) + '\n').encode('utf-8'))
+
+    def merge(self, order: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Merge the shards in ``order``."""
+        data = {}
+        for name in order:
+            if name in self.entries:
+                data.update(self.read(name))
+        return data
+
+    def stale(self, dataset_file: str) -> bool:
+        """Whether ``dataset_file`` has to be merged again.
+
+        It does if a shard changed, or if the file isn't the one the
+        shards were last merged into.
+        """
+        if self.changed:
+            return True
+        try:
+            with open(dataset_file, 'rb') as f:
+                return sha1(f.read()) != self.dataset.get('sha1')
+        except FileNotFoundError:
+            return True
@@ -0,0 +1,221 @@
+# encoding: utf-8
+"""Optional long-lived search process for the mldocs script filter.
+
+Alfred starts a fresh interpreter on every keystroke, which imports the
+workflow library, sets up logging, loads the settings and opens the
+dataset before it even gets to search. With ``MLDOCS_DAEMON=1`` set in
+the workflow's environment variables, the first query starts this
+module in the background (via :func:`workflow.background.run_in_background`)
+and later ones are forwarded to it over a Unix domain socket in the
+temporary directory (see :func:`socket_path`).
+
+The client side (:func:`enabled` and :func:`forward`) only uses the
+standard library, so ``mldocs.py`` can try it before importing anything
+else. Whenever the daemon can't answer, the query runs in-process as
+usual. The daemon exits after :data:`IDLE_TIMEOUT` seconds without a
+query.
+
+Protocol: the client sends a JSON ``{"args": [...]}`` request and shuts
+down its side of the socket, the daemon answers with the script filter
+JSON and closes the connection. An empty answer means "run it yourself".
+"""
+import json
+import os
+import sys
+import time
+
+JOB_NAME = 'mldocs-daemon'
+SOCKET_NAME = 'mldocs-{:08x}.sock'
+# written to the cache directory when the daemon can't start
+FAILED_NAME = 'mldocs-daemon.failed'
+# seconds
+IDLE_TIMEOUT = 15 * 60
+CLIENT_TIMEOUT = 2
+# seconds before starting the daemon again after it failed to start
+RETRY_AFTER = 60 * 60
+
+
+def enabled():
+    """Whether queries should go through the daemon."""
+    return (os.getenv('MLDOCS_DAEMON', '').lower() in ('1', 'true', 'yes')
+            and bool(os.getenv('alfred_workflow_cache'))
+            # let the debugger show what really happens
+            and os.getenv('alfred_debug') != '1')
+
+
+def socket_path(cachedir):
+    """Socket of the daemon serving the workflow cached in ``cachedir``.
+
+    Not in the cache directory: Alfred's is deep enough for the path to
+    exceed the 104 bytes a Unix socket path can have on macOS. The
+    per-user ``$TMPDIR`` is short, a hash of ``cachedir`` tells apart
+    the workflows (and users) sharing it.
+
+    """
+    import zlib
+
+    name = SOCKET_NAME.format(zlib.crc32(os.fsencode(cachedir)))
+    return os.path.join(os.getenv('TMPDIR') or '/tmp', name)
+
+
+def _read_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def query(args, cachedir=None, timeout=CLIENT_TIMEOUT):
+    """Ask the daemon for the results of ``args``.
+
+    :returns: script filter JSON as ``bytes`` or ``None`` if the daemon
+        didn't answer
+
+    """
+    # only imported when the daemon is enabled, it's not free
+    import socket
+
+    cachedir = cachedir or os.getenv('alfred_workflow_cache')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path(cachedir))
+        sock.sendall(json.dumps({'args': args}).encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        return _read_all(sock) or None
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+
+def forward(args):
+    """Print the daemon's results for ``args`` and return ``True``.
+
+    Returns ``False`` (and prints nothing) if the query has to run
+    in-process: magic arguments, or the daemon is down.
+
+    """
+    if any(arg.startswith('workflow:') for arg in args):
+        return False
+    output = query(args)
+    if output is None:
+        return False
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    stdout.write(output)
+    stdout.flush()
+    return True
+
+
+def start(wf):
+    """Start the daemon in the background unless it's already running."""
+    from workflow.background import is_running, run_in_background
+
+    if is_running(JOB_NAME):
+        return
+    failed = wf.cachefile(FAILED_NAME)
+    try:
+        if time.time() - os.stat(failed).st_mtime < RETRY_AFTER:
+            # don't try again on every keystroke
+            wf.logger.debug('search daemon failed to start, see %s', failed)
+            return
+    except OSError:
+        pass
+    wf.logger.debug('starting search daemon')
+    run_in_background(JOB_NAME, [sys.executable, os.path.abspath(__file__)],
+                      cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+class Server(object):
+    """Answer script filter queries from a dataset kept in memory.
+
+    :param idle_timeout: seconds without a query before :meth:`serve`
+        returns
+
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        import mldocs
+
+        self.mldocs = mldocs
+        self.idle_timeout = idle_timeout
+        self.wf = mldocs.make_workflow()
+        self.store = None
+        self._store_mtime = None
+
+    def load_store(self):
+        """Return the dataset, reloading it if the cache was refreshed."""
+        wf, mldocs = self.wf, self.mldocs
+        path = wf.cachefile('data.mlstore')
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if (self.store is None or mtime != self._store_mtime
+                or not wf.cached_data_fresh('data', mldocs.DATA_MAX_AGE, serializer='mlstore')):
+            self.store = mldocs.load_store(wf)
+            self._store_mtime = os.stat(path).st_mtime_ns
+        return self.store
+
+    def respond(self, args):
+        """Return the script filter JSON for ``args`` as ``bytes``."""
+        mldocs = self.mldocs
+        wf = mldocs.make_workflow()
+        if wf._update_settings:
+            wf.check_update()
+        mldocs.add_update_notice(wf)
+        mldocs.add_results(wf, [wf.decode(arg) for arg in args], self.load_store(), session=False)
+        return wf.to_json().encode('utf-8')
+
+    def handle(self, conn):
+        try:
+            request = json.loads(_read_all(conn).decode('utf-8'))
+            conn.sendall(self.respond(request['args']))
+        except Exception:
+            # the client runs the query itself on an empty answer
+            self.wf.logger.exception('search daemon failed to answer')
+
+    def serve(self):
+        """Accept queries until none came for ``idle_timeout`` seconds."""
+        import socket
+
+        path = socket_path(self.wf.cachedir)
+        failed = self.wf.cachefile(FAILED_NAME)
+        if os.path.exists(path):
+            os.unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                sock.bind(path)
+                # $TMPDIR may be /tmp, shared with the other users
+                os.chmod(path, 0o600)
+                sock.listen(8)
+                sock.settimeout(self.idle_timeout)
+                self.load_store()
+            except Exception as err:
+                self.wf.logger.exception('search daemon failed to start')
+                with open(failed, 'w') as fp:
+                    fp.write('{}: {}\n'.format(path, err))
+                raise
+            if os.path.exists(failed):
+                os.unlink(failed)
+            self.wf.logger.debug('search daemon listening on %s', path)
+            while True:
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    break
+                with conn:
+                    conn.settimeout(CLIENT_TIMEOUT)
+                    self.handle(conn)
+        finally:
+            sock.close()
+            if os.path.exists(path):
+                os.unlink(path)
+        self.wf.logger.debug('search daemon idle, exiting')
+
+
+if __name__ == '__main__':
+    Server().serve()
@@ -1,34 +1,72 @@
 #!/usr/bin/python
 # encoding: utf-8
-import json
 import math
 import os
 import string
 import sys
+import time
+from array import array
+from urllib.parse import quote
+
+# the imports below are timed, see workflow:perf
+IMPORT_START = time.perf_counter_ns()
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'libs'))
 
-from libs import requests
-# from libs import requests
-from workflow import ICON_INFO
-# Workflow3 supports Alfred 3's new features. The `Workflow` class
-# is also compatible with Alfred 2.
-from workflow import Workflow3
+import mldaemon  # noqa: E402
 
+# hand the query to the warm search daemon before importing anything else
+# (opt-in, see mldaemon.py), it's run right here if the daemon is down
+if __name__ == '__main__' and mldaemon.enabled() and mldaemon.forward(sys.argv[1:]):
+    sys.exit(0)
 
-def get_ml_docs():
-    data_url = 'https://raw.githubusercontent.com/lsgrep/mldocs/master/data/ml.json'
-    result = requests.get(data_url)
+import mlformat  # noqa: E402
+import mlsync  # noqa: E402
+from mlstore import KeywordStoreSerializer, build_store  # noqa: E402
+from workflow import ICON_INFO  # noqa: E402
+# Workflow3 supports Alfred 3's new features. The `Workflow` class
+# is also compatible with Alfred 2.
+from workflow import Workflow3  # noqa: E402
+from workflow import manager  # noqa: E402
+from workflow.util import atomic_writer  # noqa: E402
+
+IMPORT_TIME = time.perf_counter_ns() - IMPORT_START
+
+manager.register('mlstore', KeywordStoreSerializer)
+
+
+def get_ml_docs(wf):
+    # the vendored requests stack (urllib3, chardet, idna, certifi) is slow
+    # to import, so only load it when the dataset actually has to be fetched
+    from libs import requests
+
+    # only download the shards that changed since the last refresh, see mlsync.py
+    shard_dir = wf.cachefile('shards')
+    try:
+        mlsync.sync(shard_dir)
+        return mlsync.load(shard_dir)
+    except requests.HTTPError as e:
+        # no shards published (yet)
+        if e.response is None or e.response.status_code != 404:
+            raise
+    except ValueError as e:
+        # shards published while we were downloading them
+        wf.logger.warning('falling back to the full dataset: %s', e)
+
+    # compact format with interned base URLs, see mlformat.py
+    data_url = mlsync.data_url() + 'ml.jsonl'
+    result = requests.get(data_url, stream=True)
     # throw an error if request failed
     # Workflow will catch this and show it to the user
     result.raise_for_status()
-    return result.json()
+    # records are parsed as the body comes in and go straight into the store
+    return mlformat.load(line.decode('utf-8') for line in result.iter_lines(chunk_size=65536))
 
 
-def get_ml_docs_local():
-    with open('data/ml.json') as f:
-        data = json.load(f)
-    return data
+def get_ml_docs_local(wf=None):
+    with open('data/ml.jsonl', encoding='utf-8') as f:
+        header, records = mlformat.load(f)
+        return header, list(records)
 
 
 def get_assets():
@@ -47,49 +85,42 @@ def parse_domain(link):
     return link.split("//")[-1].split("/")[0]
 
 
-# expand commonly used prefixes
-# plt => pyplot
-# sns => seaborn
-# np => numpy
-# pd => pandas
-def expand_args(args):
+# resolve icons once per base URL when the data is cached, not per result
+# returns the icon table (id 0 is "no icon") and the icon id of every base
+def get_icons(bases, assets):
+    asset_keywords = sorted(assets.keys(), key=len)
+    icons = [None]
+    base_icons = []
+    for base in bases:
+        icon = None
+        # if the asset is available
+        for k in asset_keywords:
+            if k in parse_domain(base):
+                icon = assets[k]
+        if icon not in icons:
+            icons.append(icon)
+        base_icons.append(icons.index(icon))
+    return icons, base_icons
+
+
+# commonly used prefixes, the dataset comes with its own (see data/seed.yaml)
+# these are for data cached before it did
+ALIASES = {
+    'np': 'numpy',
+    'pd': 'pandas',
+    'plt': 'pyplot',
+    'sns': 'seaborn',
+}
+
+
+# expand commonly used prefixes, e.g. np => numpy, np.dot => numpy.dot
+# one dict lookup per arg, however many aliases there are
+def expand_args(args, aliases=ALIASES):
     for i, arg in enumerate(args):
-        if arg == 'plt':
-            args[i] = 'pyplot'
-            continue
-
-        if arg.startswith('plt.'):
-            rem = arg.split('.', 1)[1]
-            args[i] = 'pyplot.' + rem
-            continue
-
-        if arg == 'sns':
-            args[i] = 'seaborn'
-            continue
-
-        if arg.startswith('sns.'):
-            rem = arg.split('.', 1)[1]
-            args[i] = 'seaborn.' + rem
-            continue
-
-        if arg.lower() == 'np':
-            args[i] = 'numpy'
-            continue
-
-        if arg.startswith('np.'):
-            rem = arg.split('.', 1)[1]
-            args[i] = 'numpy.' + rem
-            continue
-
-        if arg.lower() == 'pd':
-            args[i] = 'pandas'
-            continue
-
-        if arg.startswith('pd.'):
-            rem = arg.split('.', 1)[1]
-            args[i] = 'pandas.' + rem
-            continue
-
+        head, dot, rest = arg.partition('.')
+        alias = aliases.get(head)
+        if alias is not None:
+            args[i] = alias + dot + rest
     return args
 
 
@@ -103,20 +134,54 @@ def search_priority_len(k):
         return len(k)
 
 
-def search(args, keywords):
+# every keyword matching `args` also matches `last`
+def narrows(last, args):
+    return all(any(old in new for new in args) for old in last)
+
+
+# Alfred reruns the script filter on every keystroke, so a query is
+# usually the previous one plus a character. The matches of the previous
+# query are kept in the session cache and a query narrowing it only
+# searches those again. Huge match sets aren't worth writing out.
+SESSION_MAX_MATCHES = 4096
+
+
+def match(args, store, wf=None):
+    if wf is None:
+        return store.index.search(args)
+
+    dataset = store.meta.get('built')
+    last = wf.cached_data('matches', max_age=0, session=True)
+    if last and last['dataset'] == dataset and narrows(last['args'], args):
+        if last['args'] == args:
+            return list(last['ids'])
+        ids = store.index.search(args, last['ids'])
+    else:
+        ids = store.index.search(args)
+
+    if len(ids) <= SESSION_MAX_MATCHES:
+        wf.cache_data('matches', {'dataset': dataset, 'args': args, 'ids': array('I', ids)},
+                      session=True)
+    else:
+        wf.cache_data('matches', None, session=True)
+    return ids
+
+
+# returns record ids, best match first
+# priorities are computed with search_priority_len when the store is built
+def search(args, store, limit=None, wf=None):
     # args is lower case already
-    args = expand_args(args)
-    # performance hack, eliminate dot expression
-    for k in args:
-        keywords = [i for i in keywords if k in i.lower()]
-    result = sorted(keywords, key=search_priority_len)
+    args = expand_args(args, store.meta.get('aliases', ALIASES))
+    result = store.rank(match(args, store, wf), limit)
+    if not result:
+        # no exact match, tolerate typos, skipped path parts and initials
+        result = store.fuzzy.search(args, limit)
     return result
 
 
-def custom_search(title, base_url, asset, args_index=1):
-    global wf
-    query_str = ' '.join(wf.args[args_index:])
-    query_url = base_url + requests.utils.quote(query_str)
+def custom_search(wf, title, base_url, asset, query):
+    query_str = ' '.join(query)
+    query_url = base_url + quote(query_str)
     wf.add_item(title=title + ' ' + query_str,
                 subtitle=query_url,
                 arg=query_url,
@@ -124,59 +189,125 @@ def custom_search(title, base_url, asset, args_index=1):
                 icon=asset)
 
 
-# make one big pickle, and make single disk read
-def get_data():
-    return get_ml_docs(), get_assets()
+# make one big store, memory-mapped on load so only displayed records are decoded
+# the keyword index is built once per fetch and stored along with the data
+# the store is written to `file_obj` if given, a temporary file otherwise
+def get_data(wf, file_obj=None):
+    header, records = get_ml_docs(wf)
+    assets = get_assets()
+    icons, base_icons = get_icons(header['bases'], assets)
+    aliases = header.get('aliases', ALIASES)
+    store = build_store(header['bases'], records, icons, base_icons,
+                        priority=search_priority_len,
+                        meta={'assets': assets, 'built': time.time()},
+                        file_obj=file_obj,
+                        aliases=aliases)
+    # build_store() drops those, they would only hide the prefix's own matches
+    unused = sorted(set(aliases) - set(store.meta['aliases']))
+    if unused:
+        wf.logger.warning('ignored aliases standing for nothing in the data: %s',
+                          ', '.join(unused))
+    return store
+
+
+DATA_MAX_AGE = 3600 * 24 * 3
+# expired data is still used while this refreshes it in the background,
+# only the very first query waits for the download
+REFRESH_COMMAND = [sys.executable, '-c', 'import mldocs; mldocs.refresh_data()']
+# seconds before a failed refresh is tried again
+REFRESH_RETRY = 3600
+
+
+def load_store(wf):
+    def data():
+        return get_data(wf)
+
+    try:
+        return wf.cached_data('data', data, max_age=DATA_MAX_AGE, serializer='mlstore',
+                              revalidate=REFRESH_COMMAND)
+    except ValueError:
+        # cached by an older version of the workflow, rebuild it
+        wf.cache_data('data', None, serializer='mlstore')
+        return wf.cached_data('data', data, max_age=DATA_MAX_AGE, serializer='mlstore')
+
+
+# run by REFRESH_COMMAND in the workflow directory
+def refresh_data():
+    wf = make_workflow()
+    try:
+        # straight into the cache file, replaced once it's complete
+        with atomic_writer(wf.cachefile('data.mlstore'), 'w+b') as fp:
+            get_data(wf, fp)
+    except Exception:
+        wf.logger.exception('refreshing the data failed')
+        # offline? keep using the expired data for a while instead of
+        # starting a refresh on every keystroke
+        path = wf.cachefile('data.mlstore')
+        if os.path.exists(path):
+            retry = time.time() - DATA_MAX_AGE + REFRESH_RETRY
+            os.utime(path, (retry, retry))
+        raise
+
+
+def make_workflow():
+    github_slug = 'lsgrep/mldocs'
+    help_url = 'https://github.com/' + github_slug
+    return Workflow3(update_settings={'github_slug': github_slug,
+                                      'frequency': 7,
+                                      help_url: help_url},
+                     libraries=[os.path.abspath(os.path.join(os.path.dirname(__file__), 'libs'))])
 
 
-def main(wf):
-    # The Workflow3 instance will be passed to the function
-    # you call from `Workflow3.run`.
-    # Not super useful, as the `wf` object created in
-    # the `if __name__ ...` clause below is global...
-    #
-    # Your imports go here if you want to catch import errors, which
-    # is not a bad idea, or if the modules/packages are in a directory
-    # added via `Workflow3(libraries=...)`
-    # import somemodule
-    # import anothermodule
+def add_update_notice(wf):
+    if wf.update_available:
+        # Add a notification to top of Script Filter results
+        wf.add_item('New version available',
+                    'Upgrade mldocs workflow',
+                    autocomplete='workflow:update',
+                    icon=ICON_INFO)
 
-    # Get args from Workflow3, already in normalized Unicode.
-    # This is also necessary for "magic" arguments to work.
-    args = [i.lower() for i in wf.args]
-    ml_data, assets = wf.cached_data('data', get_data, max_age=3600 * 24 * 3)
-    asset_keywords = sorted(assets.keys(), key=len)
+
+# adds the results of `query` (the raw args) to the feedback
+# the search daemon has no Alfred session, it passes session=False
+def add_results(wf, query, store, session=True):
+    args = [i.lower() for i in query]
+    assets = store.meta['assets']
 
     if len(args) > 1 and args[0] == 'gds':
         gds_search = 'https://datasetsearch.research.google.com/search?query='
         title = 'Google Dataset Search'
-        custom_search(title, base_url=gds_search, asset=assets['google'])
+        custom_search(wf, title, base_url=gds_search, asset=assets['google'], query=query[1:])
     elif len(args) > 1 and args[0] == 'paper':
         paper_search = 'http://paperswithcode.com/search?q='
         title = 'Papers With Code'
-        custom_search(title, base_url=paper_search, asset=assets['paper'])
+        custom_search(wf, title, base_url=paper_search, asset=assets['paper'], query=query[1:])
     else:
-        result = search(args, ml_data.keys())
+        if session:
+            # first run of this session, drop the leftovers of earlier ones
+            if not os.getenv('_WF_SESSION_ID'):
+                wf.clear_session_cache()
+            with wf.timer('search'):
+                result = search(args, store, limit=15, wf=wf)
+        else:
+            with wf.timer('search'):
+                result = search(args, store, limit=15)
         # nothing to be found, let's Google
         if len(result) == 0:
             google_search = 'https://www.google.com/search?q='
             title = 'Google Search'
             # will use all the args
-            custom_search(title, base_url=google_search, asset=assets['google'], args_index=0)
+            custom_search(wf, title, base_url=google_search, asset=assets['google'], query=query)
         else:
-            for ml_keyword in result[:15]:
-                doc_link = ml_data[ml_keyword]['url']
+            with wf.timer('icons'):
+                icons = [store.icon(i) for i in result]
+            for i, icon in zip(result, icons):
+                ml_keyword = store.keys[i]
+                doc_link = store.url(i)
                 doc_desc = doc_link  # default value
 
                 # if there is a desc, we use it
-                if ml_data[ml_keyword].get('desc'):
-                    doc_desc = ml_data[ml_keyword]['desc']
-                icon = None
-
-                # if the asset is available
-                for k in asset_keywords:
-                    if k in parse_domain(doc_link):
-                        icon = assets[k]
+                if store.descs[i]:
+                    doc_desc = store.descs[i]
 
                 wf.add_item(title=ml_keyword,
                             subtitle=doc_desc,
@@ -184,26 +315,38 @@ def main(wf):
                             valid=True,
                             icon=icon)
 
+
+def main(wf):
+    # The Workflow3 instance will be passed to the function
+    # you call from `Workflow3.run`.
+    # Not super useful, as the `wf` object created in
+    # the `if __name__ ...` clause below is global...
+    #
+    # Your imports go here if you want to catch import errors, which
+    # is not a bad idea, or if the modules/packages are in a directory
+    # added via `Workflow3(libraries=...)`
+    # import somemodule
+    # import anothermodule
+
+    # Get args from Workflow3, already in normalized Unicode.
+    # This is also necessary for "magic" arguments to work.
+    add_results(wf, wf.args, load_store(wf))
+
     # Send output to Alfred. You can only call this once.
     # Well, you *can* call it multiple times, but subsequent calls
     # are ignored (otherwise the JSON sent to Alfred would be invalid).
     wf.send_feedback()
 
+    if mldaemon.enabled():
+        # answer the next queries from memory
+        mldaemon.start(wf)
+
 
 if __name__ == '__main__':
     # Create a global `Workflow3` object
-    github_slug = 'lsgrep/mldocs'
-    help_url = 'https://github.com/' + github_slug
-    wf = Workflow3(update_settings={'github_slug': github_slug,
-                                    'frequency': 7,
-                                    help_url: help_url},
-                   libraries=[os.path.abspath(os.path.join(os.path.dirname(__file__), 'libs'))])
-    if wf.update_available:
-        # Add a notification to top of Script Filter results
-        wf.add_item('New version available',
-                    'Upgrade mldocs workflow',
-                    autocomplete='workflow:update',
-                    icon=ICON_INFO)
+    wf = make_workflow()
+    wf.timings['import'] = IMPORT_TIME
+    add_update_notice(wf)
 
     # Call your entry function via `Workflow3.run()` to enable its
     # helper functions, like exception catching, ARGV normalization,
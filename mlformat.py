@@ -0,0 +1,107 @@
+# encoding: utf-8
+"""Compact, line-oriented format of the published mldocs dataset.
+
+Nearly every URL in the dataset starts with one of a few hundred base
+URLs and most of them repeat the keyword itself, e.g.
+``https://numpy.org/doc/stable/reference/generated/numpy.dot.html#numpy.dot``.
+The compact format stores each base once and the rest of the URL with
+the keyword replaced by ``{}``::
+
+    {"format": "mldocs", "version": 1, "bases": ["https://numpy.org/doc/stable/reference/generated/", ...]}
+    ["numpy.dot", 0, "{}.html#{}"]
+    ["colab", 7, "", "Colab notebooks allow you to ..."]
+
+The first line is a header, every other line is one record:
+keyword, index into ``bases``, URL suffix and an optional description.
+Records are in dataset order. Literal braces in URLs are percent-encoded,
+so ``{}`` is unambiguous.
+
+The header may also map query prefixes to what they stand for, e.g.
+``"aliases": {"np": "numpy", "pd": "pandas"}`` (see ``data/seed.yaml``).
+"""
+import json
+from urllib.parse import urlsplit
+
+FORMAT = 'mldocs'
+VERSION = 1
+KEY = '{}'
+
+
+def url_base(url):
+    """Return the part of ``url`` that is interned.
+
+    That's the scheme and host, then the path up to its last ``/``, so a
+    bare domain like ``https://jax.dev`` keeps its host.
+
+    """
+    parts = urlsplit(url)
+    head = url[:url.find(parts.netloc) + len(parts.netloc)] if parts.netloc else ''
+    return head + parts.path[:parts.path.rfind('/') + 1]
+
+
+def expand_url(base, suffix, key):
+    """Rebuild the full URL of a record."""
+    return base + suffix.replace(KEY, key)
+
+
+def encode(data, aliases=None):
+    """Encode ``{keyword: {'url': ..., 'desc': ...}}`` in the compact format.
+
+    :param aliases: query prefixes stored in the header
+    :returns: ``(header, records)`` where records are lists ready to be
+        written one per line
+
+    """
+    bases = {}
+    records = []
+    for key, value in data.items():
+        url = value['url'].replace('{', '%7B').replace('}', '%7D')
+        base = url_base(url)
+        base_id = bases.setdefault(base, len(bases))
+        suffix = url[len(base):]
+        if key:
+            suffix = suffix.replace(key, KEY)
+        record = [key, base_id, suffix]
+        if value.get('desc'):
+            record.append(value['desc'])
+        records.append(record)
+
+    header = {'format': FORMAT, 'version': VERSION, 'bases': list(bases)}
+    if aliases:
+        header['aliases'] = aliases
+    return header, records
+
+
+def dump(data, file_obj, aliases=None):
+    """Write ``data`` to text file ``file_obj`` in the compact format."""
+    header, records = encode(data, aliases)
+    file_obj.write(json.dumps(header, ensure_ascii=False))
+    file_obj.write('\n')
+    for record in records:
+        file_obj.write(json.dumps(record, ensure_ascii=False))
+        file_obj.write('\n')
+
+
+def load(lines):
+    """Parse the compact format from an iterable of lines.
+
+    :returns: ``(header, records)``, ``records`` being a generator of
+        ``(keyword, base_id, suffix, desc)`` tuples
+
+    """
+    lines = iter(lines)
+    header = json.loads(next(lines))
+    if header.get('format') != FORMAT or header.get('version') != VERSION:
+        raise ValueError('unsupported dataset format: {0}'.format(
+            {k: header.get(k) for k in ('format', 'version')}))
+
+    def records():
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if len(record) == 3:
+                record.append('')
+            yield tuple(record)
+
+    return header, records()
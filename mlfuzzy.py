@@ -0,0 +1,228 @@
+# encoding: utf-8
+"""Typo-tolerant fallback matching for queries without exact matches.
+
+Keywords are split into atoms: the parts of their dotted (or
+underscored) path, plus the words of camel-case parts
+(``RandomForestClassifier`` -> ``randomforestclassifier``, ``random``,
+``forest``, ``classifier``). Every atom of a query has to match an atom
+of the keyword, wherever it is in the path, so ``torch.conv2d`` finds
+``torch.nn.Conv2d``. An atom matches when it is
+
+* the same atom (cost 0)
+* a prefix of the atom (cost 1)
+* one edit away from the atom, for atoms of 4+ characters (cost 2).
+  Candidates are found through a deletion neighbourhood table: every atom
+  is listed under the CRC32 of each of its one-character deletions.
+
+A single-word query also matches the initials of camel-case names
+(``rfc``) and of dotted paths (``tkld`` for ``tf.keras.layers.Dense``)
+at cost 1.
+
+All tables are built with the store (see :mod:`mlstore`). Results are
+ranked by total cost, then by keyword priority.
+"""
+import bisect
+import heapq
+import re
+import zlib
+from array import array
+
+from mlindex import pack_postings
+
+# shortest atom that tolerates a typo
+TYPO_MIN_LEN = 4
+# longest atom listed in the deletion table
+TYPO_MAX_LEN = 32
+# number of atoms a query atom may match as a prefix
+PREFIX_LIMIT = 256
+
+EXACT, PREFIX, INITIALS, TYPO = 0, 1, 1, 2
+
+_SEGMENTS = re.compile(r'[^\W_]+')
+_CAMEL = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+[a-z]*')
+
+
+def atoms(key):
+    """Return the set of lower-case atoms of ``key``."""
+    result = set()
+    for segment in _SEGMENTS.findall(key):
+        result.add(segment.lower())
+        parts = _CAMEL.findall(segment)
+        if len(parts) > 1:
+            result.update(part.lower() for part in parts)
+    return result
+
+
+def initials(key):
+    """Return the set of initials ``key`` can be abbreviated to."""
+    result = set()
+    components = [c for c in key.split('.') if c]
+    if len(components) > 1:
+        result.add(''.join(c[0] for c in components).lower())
+    for segment in _SEGMENTS.findall(key):
+        parts = _CAMEL.findall(segment)
+        if len(parts) > 1:
+            result.add(''.join(p[0] for p in parts).lower())
+    return result
+
+
+def deletions(atom):
+    """Return ``atom`` and its one-character deletions."""
+    return {atom} | {atom[:i] + atom[i + 1:] for i in range(len(atom))}
+
+
+def _crc(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def within_one_edit(a, b):
+    """Whether ``a`` and ``b`` are at most one edit apart.
+
+    An edit is an insertion, deletion, substitution or transposition of
+    adjacent characters.
+
+    """
+    if a == b:
+        return True
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return (a[i + 1:] == b[i + 1:]
+            or (i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]))
+
+
+def build_fuzzy(keys):
+    """Build the fuzzy matching tables of ``keys``.
+
+    :returns: ``dict`` of ``(terms, offsets, ids)`` tuples and arrays,
+        see :class:`FuzzyIndex`
+
+    """
+    atom_postings = {}
+    initial_postings = {}
+    for i, key in enumerate(keys):
+        for atom in atoms(key):
+            atom_postings.setdefault(atom, array('I')).append(i)
+        for initial in initials(key):
+            initial_postings.setdefault(initial, array('I')).append(i)
+
+    atom_list, atom_offsets, atom_ids = pack_postings(atom_postings)
+    pairs = []
+    for atom_id, atom in enumerate(atom_list):
+        if TYPO_MIN_LEN - 1 <= len(atom) <= TYPO_MAX_LEN:
+            pairs.extend((_crc(variant), atom_id) for variant in deletions(atom))
+    pairs.sort()
+    return {
+        'atoms': (atom_list, atom_offsets, atom_ids),
+        'initials': pack_postings(initial_postings),
+        'deletion_crcs': array('I', (crc for crc, _ in pairs)),
+        'deletion_atoms': array('I', (atom_id for _, atom_id in pairs)),
+    }
+
+
+class FuzzyIndex(object):
+    """Fuzzy matching tables of the dataset.
+
+    :param atoms: sorted atoms, supporting ``bisect()``
+    :param atom_offsets: start of each atom's posting list in ``atom_ids``
+    :param atom_ids: keyword ids of every atom, back to back
+    :param initials: sorted initials, supporting ``bisect()``
+    :param initial_offsets: start of each posting list in ``initial_ids``
+    :param initial_ids: keyword ids of every initials, back to back
+    :param deletion_crcs: sorted CRC32 of the atoms' deletions
+    :param deletion_atoms: atom id of every entry in ``deletion_crcs``
+    :param priorities: rank of every keyword, lower is better
+
+    """
+
+    def __init__(self, atoms, atom_offsets, atom_ids, initials, initial_offsets,
+                 initial_ids, deletion_crcs, deletion_atoms, priorities):
+        self.atoms = atoms
+        self.atom_offsets = atom_offsets
+        self.atom_ids = atom_ids
+        self.initials = initials
+        self.initial_offsets = initial_offsets
+        self.initial_ids = initial_ids
+        self.deletion_crcs = deletion_crcs
+        self.deletion_atoms = deletion_atoms
+        self.priorities = priorities
+
+    def match_atom(self, atom):
+        """Return ``{atom_id: cost}`` of the atoms ``atom`` matches."""
+        table = self.atoms
+        costs = {}
+        start = bisect.bisect_left(table, atom)
+        end = min(start + PREFIX_LIMIT, len(table))
+        for atom_id in range(start, end):
+            if not table[atom_id].startswith(atom):
+                break
+            costs[atom_id] = EXACT if table[atom_id] == atom else PREFIX
+
+        if len(atom) >= TYPO_MIN_LEN:
+            crcs, atom_ids = self.deletion_crcs, self.deletion_atoms
+            for variant in deletions(atom):
+                crc = _crc(variant)
+                i = bisect.bisect_left(crcs, crc)
+                while i < len(crcs) and crcs[i] == crc:
+                    atom_id = atom_ids[i]
+                    i += 1
+                    if atom_id not in costs and within_one_edit(atom, table[atom_id]):
+                        costs[atom_id] = TYPO
+        return costs
+
+    def match_token(self, token):
+        """Return ``{keyword_id: cost}`` of the keywords matching ``token``."""
+        scores = None
+        for atom in set(_SEGMENTS.findall(token)):
+            matches = {}
+            # cheapest first, so every keyword keeps its lowest cost
+            for atom_id, cost in sorted(self.match_atom(atom).items(), key=lambda item: item[1]):
+                for i in self.atom_ids[self.atom_offsets[atom_id]:self.atom_offsets[atom_id + 1]]:
+                    if i not in matches:
+                        matches[i] = cost
+            scores = matches if scores is None else {
+                i: cost + matches[i] for i, cost in scores.items() if i in matches}
+            if not scores:
+                break
+
+        if token.isalnum():
+            slot = self.initials.bisect(token)
+            if slot is not None:
+                scores = scores or {}
+                for i in self.initial_ids[self.initial_offsets[slot]:self.initial_offsets[slot + 1]]:
+                    if scores.get(i, INITIALS + 1) > INITIALS:
+                        scores[i] = INITIALS
+        return scores or {}
+
+    def search(self, tokens, limit=None):
+        """Return ids of keywords fuzzily matching every token, best first.
+
+        :param tokens: lower-case query tokens
+        :param limit: maximum number of ids to return
+        :returns: ``list`` of keyword ids
+
+        """
+        scores = None
+        for token in tokens:
+            matches = self.match_token(token)
+            scores = matches if scores is None else {
+                i: cost + matches[i] for i, cost in scores.items() if i in matches}
+            if not scores:
+                return []
+        if not scores:
+            return []
+
+        priorities = self.priorities
+
+        def key(i):
+            return scores[i], priorities[i], i
+
+        if limit is None:
+            return sorted(scores, key=key)
+        return heapq.nsmallest(limit, scores, key=key)
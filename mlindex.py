@@ -0,0 +1,201 @@
+# encoding: utf-8
+"""Trigram inverted index over the keywords of the mldocs dataset.
+
+The index is built once, when the dataset is fetched, and stored next to
+it (see :mod:`mlstore`). Queries intersect the posting lists of their
+trigrams instead of scanning (and lower-casing) every keyword on every
+keystroke.
+
+The tokens of a query are looked up rarest first, as estimated from the
+lengths of their posting lists, so a broad token like ``nn`` only checks
+the few keywords left by the others.
+"""
+from array import array
+from bisect import bisect_left
+
+GRAM_SIZE = 3
+# below this ratio of lengths, sets intersect sorted ids faster than bisecting
+GALLOP_RATIO = 32
+
+
+def trigrams(text):
+    """Return the set of trigrams in ``text``."""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def build_postings(lowered):
+    """Build the posting lists of the lower-case keywords ``lowered``.
+
+    All posting lists are packed into one array: the ids of the keywords
+    containing ``grams[slot]`` are ``ids[offsets[slot]:offsets[slot + 1]]``.
+
+    :returns: ``(grams, offsets, ids)`` with ``grams`` sorted
+
+    """
+    postings = {}
+    for i, key in enumerate(lowered):
+        for gram in trigrams(key):
+            ids = postings.get(gram)
+            if ids is None:
+                ids = postings[gram] = array('I')
+            ids.append(i)
+    return pack_postings(postings)
+
+
+def intersect(a, b):
+    """Return the ids in both ``a`` and ``b``, sorted ascending lists of ids.
+
+    A much shorter list gallops through the longer one with
+    :func:`bisect.bisect_left`, skipping what it can't contain, lists of
+    similar lengths are intersected as sets.
+
+    :returns: ``list`` of ids in ascending order
+
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) * GALLOP_RATIO >= len(b):
+        return sorted(set(a).intersection(b))
+    result = []
+    lo = 0
+    end = len(b)
+    for i in a:
+        lo = bisect_left(b, i, lo)
+        if lo == end:
+            break
+        if b[lo] == i:
+            result.append(i)
+    return result
+
+
+def pack_postings(postings):
+    """Pack ``{term: ids}`` into one array, see :func:`build_postings`.
+
+    :returns: ``(terms, offsets, ids)`` with ``terms`` sorted
+
+    """
+    terms = sorted(postings)
+    offsets = array('I', [0])
+    ids = array('I')
+    for term in terms:
+        ids.extend(postings[term])
+        offsets.append(len(ids))
+    return terms, offsets, ids
+
+
+class KeywordIndex(object):
+    """Inverted index mapping trigrams to the ids of the keywords containing them.
+
+    Keyword ids are positions in the dataset, so iterating ids in ascending
+    order yields keywords in the same order as the dataset itself.
+
+    :param lowered: lower-case keywords in dataset order
+    :param grams: sorted trigrams, supporting ``bisect()``
+    :param offsets: start of each trigram's posting list in ``ids``
+    :param ids: all posting lists, back to back
+
+    """
+
+    def __init__(self, lowered, grams, offsets, ids):
+        self.lowered = lowered
+        self.grams = grams
+        self.offsets = offsets
+        self.ids = ids
+        self._all_lowered = None
+
+    def __len__(self):
+        return len(self.lowered)
+
+    def posting(self, gram):
+        """Return ids of keywords containing trigram ``gram``."""
+        slot = self.grams.bisect(gram)
+        if slot is None:
+            return ()
+        return self.ids[self.offsets[slot]:self.offsets[slot + 1]]
+
+    def estimate(self, token):
+        """Return an upper bound of the number of keywords containing ``token``.
+
+        That's the length of its shortest posting list, without copying
+        any, or the number of keywords for tokens too short to have a
+        trigram.
+
+        """
+        if len(token) < GRAM_SIZE:
+            return len(self)
+        offsets = self.offsets
+        least = len(self)
+        for gram in trigrams(token):
+            slot = self.grams.bisect(gram)
+            if slot is None:
+                return 0
+            least = min(least, offsets[slot + 1] - offsets[slot])
+        return least
+
+    def lookup(self, token, ids=None):
+        """Return ids of keywords containing ``token``, in ascending order.
+
+        :param token: lower-case query token
+        :param ids: optional candidate ids to restrict the lookup to
+        :returns: ``list`` of keyword ids
+
+        """
+        if len(token) < GRAM_SIZE:
+            # too short to have a trigram, check the candidates directly
+            if ids is not None and self._all_lowered is None and len(ids) * 16 < len(self):
+                # only a few, decode just them
+                lowered = self.lowered
+                return [i for i in ids if token in lowered[i]]
+            if self._all_lowered is None:
+                self._all_lowered = self.lowered.tolist()
+            lowered = self._all_lowered
+            if ids is None:
+                return [i for i, key in enumerate(lowered) if token in key]
+            return [i for i in ids if token in lowered[i]]
+
+        lists = []
+        for gram in trigrams(token):
+            posting = self.posting(gram)
+            if not posting:
+                return []
+            lists.append(posting)
+        lists.sort(key=len)
+
+        if ids is not None and len(ids) <= len(lists[0]):
+            # fewer candidates than postings, checking them is cheaper
+            lowered = self.lowered
+            return [i for i in ids if token in lowered[i]]
+
+        candidates = lists[0]
+        for posting in lists[1:]:
+            candidates = intersect(candidates, posting)
+            if not candidates:
+                return []
+        if ids is not None:
+            candidates = intersect(candidates, ids)
+
+        # sharing all trigrams doesn't make it a substring, so verify
+        lowered = self.lowered
+        return [i for i in candidates if token in lowered[i]]
+
+    def search(self, tokens, ids=None):
+        """Return ids of keywords containing every token in ``tokens``.
+
+        :param tokens: lower-case query tokens
+        :param ids: optional candidate ids (ascending) to restrict the
+            search to
+        :returns: ``list`` of keyword ids in ascending order
+
+        """
+        # rarest first, so the others only check its survivors, short
+        # tokens last
+        plan = sorted((self.estimate(token), len(token) < GRAM_SIZE, token) for token in set(tokens))
+        if plan and plan[0][0] == 0:
+            return []
+        for _, _, token in plan:
+            ids = self.lookup(token, ids)
+            if not ids:
+                return []
+        if ids is None:
+            return list(range(len(self.lowered)))
+        return list(ids)
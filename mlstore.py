@@ -0,0 +1,363 @@
+# encoding: utf-8
+"""Compact, memory-mappable on-disk store for the mldocs dataset.
+
+The store replaces the pickled ``{keyword: {'url': ..., 'desc': ...}}``
+dict. Loading it is an ``mmap`` call, and only the records that are
+actually displayed get decoded.
+
+File layout (native byte order, every section 8-byte aligned)::
+
+    header      magic, format version, number of sections
+    directory   (name, offset, size) for every section
+    sections    string tables, uint32 arrays and a JSON ``meta`` blob
+
+A string table is a uint32 count, the count + 1 uint32 offsets of its
+items and a pool of NUL-terminated UTF-8 strings.
+"""
+import bisect
+import heapq
+import json
+import mmap
+import struct
+import tempfile
+from array import array
+
+from mlformat import expand_url
+from mlfuzzy import FuzzyIndex, build_fuzzy
+from mlindex import KeywordIndex, build_postings
+from workflow.workflow import BaseSerializer
+
+MAGIC = b'MLDS'
+VERSION = 5
+
+_HEADER = struct.Struct('=4sII')
+_ENTRY = struct.Struct('=16sQQ')
+_COUNT = struct.Struct('=II')
+
+# rank() walks the global rank order when more than 1/DENSE of the
+# records are candidates
+DENSE = 8
+
+
+def _write_string_table(items, file_obj):
+    """Write ``items`` to ``file_obj`` as a string table section.
+
+    The offsets are computed in a first pass, so the string pool is
+    written in batches rather than assembled in memory.
+
+    """
+    offsets = array('I', [0])
+    end = 0
+    for item in items:
+        end += len(item.encode('utf-8')) + 1
+        offsets.append(end)
+    file_obj.write(_COUNT.pack(len(offsets) - 1, 0))
+    offsets.tofile(file_obj)
+    for start in range(0, len(items), 4096):
+        batch = items[start:start + 4096]
+        file_obj.write('\0'.join(batch).encode('utf-8') + b'\0')
+
+
+def write_sections(sections, file_obj):
+    """Write a store made of ``sections`` to ``file_obj``.
+
+    Sections are written one after the other and the directory is
+    filled in at the end, so the store is never assembled in memory.
+
+    :param sections: ``(name, data)`` pairs, ``data`` being ``bytes``, an
+        ``array`` or a callable writing the section to the file it's
+        passed
+    :param file_obj: seekable binary file, positioned at its start
+
+    """
+    file_obj.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+    file_obj.write(b'\0' * (_ENTRY.size * len(sections)))
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    directory = []
+    for name, data in sections:
+        # 8-byte alignment
+        file_obj.write(b'\0' * (-offset % 8))
+        offset += -offset % 8
+        if callable(data):
+            data(file_obj)
+        elif isinstance(data, array):
+            data.tofile(file_obj)
+        else:
+            file_obj.write(data)
+        size = file_obj.tell() - offset
+        directory.append(_ENTRY.pack(name.encode('ascii'), offset, size))
+        offset += size
+    file_obj.write(b'\0' * (-offset % 8))
+    end = file_obj.tell()
+    file_obj.seek(_HEADER.size)
+    file_obj.write(b''.join(directory))
+    file_obj.seek(end)
+
+
+def _map_store(sections, file_obj):
+    write_sections(sections, file_obj)
+    file_obj.flush()
+    return KeywordStore(mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def build_store(bases, records, icons=None, base_icons=None, priority=len, meta=None,
+                file_obj=None, aliases=None):
+    """Build a :class:`KeywordStore`.
+
+    The store is written section by section to ``file_obj`` (an
+    anonymous temporary file by default) and memory-mapped from it, so
+    it's never assembled in memory.
+
+    :param bases: interned base URLs (see :mod:`mlformat`)
+    :param records: ``(keyword, base_id, url_suffix, desc)`` tuples in
+        dataset order, any iterable: they are consumed as they come
+    :param icons: icon paths, id 0 is reserved for "no icon"
+    :param base_icons: icon id of each base URL
+    :param priority: callable returning the rank of a keyword, lower
+        is better
+    :param meta: JSON-serializable ``dict`` stored alongside the records
+    :param file_obj: empty, seekable binary file to write the store to
+    :param aliases: query prefixes and what they stand for, stored in
+        ``meta`` without those that stand for nothing in the keywords
+        (they would only hide the keywords matching the prefix itself)
+    :returns: :class:`KeywordStore`
+
+    """
+    icons = icons or [None]
+    base_icons = base_icons or [0] * len(bases)
+    keys, suffixes, descs = [], [], []
+    base_ids = array('I')
+    icon_ids = array('B')
+    for key, base_id, suffix, desc in records:
+        keys.append(key)
+        base_ids.append(base_id)
+        icon_ids.append(base_icons[base_id])
+        suffixes.append(suffix)
+        descs.append(desc or '')
+    lowered = [k.lower() for k in keys]
+    grams, offsets, ids = build_postings(lowered)
+    by_key = array('I', sorted(range(len(keys)), key=keys.__getitem__))
+    priorities = array('d', map(priority, keys))
+    # stable, so ties stay in dataset order
+    by_rank = array('I', sorted(range(len(keys)), key=priorities.__getitem__))
+
+    fuzzy = build_fuzzy(keys)
+    atoms, atom_offsets, atom_ids = fuzzy['atoms']
+    initials, initial_offsets, initial_ids = fuzzy['initials']
+
+    def table(items):
+        return lambda f: _write_string_table(items, f)
+
+    meta = dict(meta or {}, bases=list(bases), icons=list(icons))
+    if aliases is not None:
+        meta['aliases'] = {alias: name for alias, name in aliases.items()
+                           if any(name in key for key in lowered)}
+    sections = [
+        ('meta', json.dumps(meta).encode('utf-8')),
+        ('keys', table(keys)),
+        ('lowered', table(lowered)),
+        ('base_ids', base_ids),
+        ('icon_ids', icon_ids),
+        ('suffixes', table(suffixes)),
+        ('descs', table(descs)),
+        ('by_key', by_key),
+        ('priorities', priorities),
+        ('by_rank', by_rank),
+        ('grams', table(grams)),
+        ('gram_offsets', offsets),
+        ('gram_ids', ids),
+        ('atoms', table(atoms)),
+        ('atom_offsets', atom_offsets),
+        ('atom_ids', atom_ids),
+        ('initials', table(initials)),
+        ('initial_offsets', initial_offsets),
+        ('initial_ids', initial_ids),
+        ('deletion_crcs', fuzzy['deletion_crcs']),
+        ('deletion_atoms', fuzzy['deletion_atoms']),
+    ]
+    if file_obj is None:
+        # the mapping outlives the file
+        with tempfile.TemporaryFile() as file_obj:
+            return _map_store(sections, file_obj)
+    return _map_store(sections, file_obj)
+
+
+class StringTable(object):
+    """Read-only sequence of strings in a string table section.
+
+    :param buf: section contents
+    :type buf: ``memoryview``
+
+    """
+
+    def __init__(self, buf):
+        count, _ = _COUNT.unpack_from(buf)
+        start = _COUNT.size
+        end = start + 4 * (count + 1)
+        self._offsets = buf[start:end].cast('I')
+        self._pool = buf[end:]
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return str(self._pool[self._offsets[i]:self._offsets[i + 1] - 1], 'utf-8')
+
+    def tolist(self):
+        """Decode every item at once (much faster than item by item)."""
+        if not self._count:
+            return []
+        return str(self._pool[:self._offsets[-1] - 1], 'utf-8').split('\0')
+
+    def bisect(self, item):
+        """Position of ``item`` in a sorted table or ``None``."""
+        i = bisect.bisect_left(self, item)
+        if i < self._count and self[i] == item:
+            return i
+        return None
+
+
+class KeywordStore(object):
+    """Dataset records backed by a (memory-mapped) store buffer.
+
+    Records are addressed by id, their position in the dataset.
+    The store also behaves as a read-only mapping of keyword to
+    ``{'url': ..., 'desc': ...}``.
+
+    :param buf: contents of a store file
+    :type buf: ``bytes``, ``bytearray`` or ``mmap.mmap``
+
+    """
+
+    def __init__(self, buf):
+        self.buffer = buf
+        view = memoryview(buf)
+        magic, version, count = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a version {0} mldocs store'.format(VERSION))
+
+        self._sections = {}
+        for i in range(count):
+            name, offset, size = _ENTRY.unpack_from(view, _HEADER.size + i * _ENTRY.size)
+            self._sections[name.rstrip(b'\0').decode('ascii')] = view[offset:offset + size]
+
+        self.meta = json.loads(str(self._sections['meta'], 'utf-8'))
+        self.bases = self.meta['bases']
+        self.icons = self.meta['icons']
+        self.keys = StringTable(self._sections['keys'])
+        self._base_ids = self._sections['base_ids'].cast('I')
+        self._icon_ids = self._sections['icon_ids']
+        self._suffixes = StringTable(self._sections['suffixes'])
+        self.descs = StringTable(self._sections['descs'])
+        self._by_key = self._sections['by_key'].cast('I')
+        self._priorities = self._sections['priorities'].cast('d')
+        self._by_rank = self._sections['by_rank'].cast('I')
+        self.index = KeywordIndex(StringTable(self._sections['lowered']),
+                                  StringTable(self._sections['grams']),
+                                  self._sections['gram_offsets'].cast('I'),
+                                  self._sections['gram_ids'].cast('I'))
+        self.fuzzy = FuzzyIndex(StringTable(self._sections['atoms']),
+                                self._sections['atom_offsets'].cast('I'),
+                                self._sections['atom_ids'].cast('I'),
+                                StringTable(self._sections['initials']),
+                                self._sections['initial_offsets'].cast('I'),
+                                self._sections['initial_ids'].cast('I'),
+                                self._sections['deletion_crcs'].cast('I'),
+                                self._sections['deletion_atoms'].cast('I'),
+                                self._priorities)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys.tolist())
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def __getitem__(self, key):
+        i = self.find(key)
+        if i is None:
+            raise KeyError(key)
+        return self.record(i)
+
+    def find(self, key):
+        """Return id of ``key`` or ``None``."""
+        by_key, keys = self._by_key, self.keys
+        lo, hi = 0, len(by_key)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[by_key[mid]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(by_key) and keys[by_key[lo]] == key:
+            return by_key[lo]
+        return None
+
+    def rank(self, ids, limit=None):
+        """Return record ``ids`` best first.
+
+        Same as sorting ``ids`` by priority, ties in dataset order, and
+        keeping the first ``limit``, without sorting all of them.
+
+        :param ids: record ids in ascending order
+        :param limit: maximum number of ids to return
+        :returns: ``list`` of record ids
+
+        """
+        priority = self._priorities.__getitem__
+        if limit is None:
+            return sorted(ids, key=priority)
+        if len(ids) * DENSE > len(self):
+            # most records match: the best of them come early in rank order
+            wanted = set(ids)
+            result = []
+            for i in self._by_rank:
+                if i in wanted:
+                    result.append(i)
+                    if len(result) == limit:
+                        break
+            return result
+        return heapq.nsmallest(limit, ids, key=priority)
+
+    def url(self, i):
+        """Return the full URL of record ``i``."""
+        return expand_url(self.bases[self._base_ids[i]], self._suffixes[i], self.keys[i])
+
+    def icon(self, i):
+        """Return the icon path of record ``i`` or ``None``."""
+        return self.icons[self._icon_ids[i]]
+
+    def record(self, i):
+        """Return record ``i`` as ``{'url': ..., 'desc': ...}``."""
+        record = {'url': self.url(i)}
+        desc = self.descs[i]
+        if desc:
+            record['desc'] = desc
+        return record
+
+
+class KeywordStoreSerializer(BaseSerializer):
+    """Cache serializer for :class:`KeywordStore`.
+
+    ``load()`` memory-maps the cache file rather than reading it, so
+    opening the store costs the same regardless of the dataset size.
+
+    """
+
+    is_binary = True
+
+    @classmethod
+    def load(cls, file_obj):
+        """Memory-map the store in ``file_obj``."""
+        return KeywordStore(mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def dump(cls, obj, file_obj):
+        """Write :class:`KeywordStore` ``obj`` to ``file_obj``."""
+        file_obj.write(obj.buffer)
+        # before the cache writer renames the file into place, or a
+        # concurrent run could map a store missing its last chunk
+        file_obj.flush()
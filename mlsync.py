@@ -0,0 +1,147 @@
+# encoding: utf-8
+"""Delta updates of the dataset from its published shards.
+
+The crawler publishes the dataset as one shard per source next to
+``ml.jsonl`` (see ``crawler/shards.py``), with a manifest listing every
+shard with its SHA-1::
+
+    <data URL>/shards/manifest.json
+    <data URL>/shards/tensorflow.jsonl
+    ...
+
+:func:`sync` fetches the manifest and only downloads the shards whose
+hash isn't in the local copy yet. Local shards are named after their
+hash, and the local manifest is replaced after every shard it lists is
+in place, so an interrupted update leaves the previous version intact.
+:func:`load` merges the local shards the same way the crawler merges
+them into ``ml.jsonl``.
+
+The data URL is ``MLDOCS_DATA_URL`` if set (e.g. a local file server),
+the repository's ``data`` directory on GitHub otherwise.
+"""
+import hashlib
+import json
+import os
+
+import mlformat
+from workflow.util import LockFile, atomic_writer
+
+DATA_URL = 'https://raw.githubusercontent.com/lsgrep/mldocs/master/data/'
+MANIFEST = 'manifest.json'
+# format of the published manifest, see crawler/shards.py
+FORMAT = 'mldocs-shards'
+VERSION = 1
+
+
+def data_url():
+    """Return the URL the dataset is published at, ending in ``/``."""
+    url = os.getenv('MLDOCS_DATA_URL') or DATA_URL
+    return url if url.endswith('/') else url + '/'
+
+
+def shard_path(directory, entry):
+    return os.path.join(directory, entry['sha1'] + '.jsonl')
+
+
+def read_manifest(directory):
+    """Return the local manifest or ``None``."""
+    try:
+        with open(os.path.join(directory, MANIFEST), 'rb') as fp:
+            return json.loads(fp.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def _get(session, url):
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+def sync(directory, base_url=None):
+    """Download the shards of the published dataset that changed.
+
+    :param directory: local copy of the shards
+    :param base_url: where the dataset is published, :func:`data_url`
+        by default
+    :returns: ``(manifest, downloaded)``, ``downloaded`` being the
+        entries of the shards that were fetched
+    :raises requests.HTTPError: if the manifest or a shard can't be
+        fetched
+    :raises ValueError: if the manifest isn't supported or a shard
+        doesn't match its hash
+
+    """
+    # see get_ml_docs() about the lazy import
+    from libs import requests
+
+    base_url = base_url or data_url()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with requests.Session() as session, LockFile(os.path.join(directory, MANIFEST)):
+        body = _get(session, base_url + 'shards/' + MANIFEST)
+        manifest = json.loads(body.decode('utf-8'))
+        if manifest.get('format') != FORMAT or manifest.get('version') != VERSION:
+            raise ValueError('unsupported shard manifest: {0}'.format(
+                {k: manifest.get(k) for k in ('format', 'version')}))
+
+        downloaded = []
+        for entry in manifest['shards']:
+            path = shard_path(directory, entry)
+            if os.path.exists(path):
+                continue
+            shard = _get(session, base_url + 'shards/' + entry['file'])
+            # the manifest was published along with another version
+            if hashlib.sha1(shard).hexdigest() != entry['sha1']:
+                raise ValueError('shard {0} does not match the manifest'.format(entry['file']))
+            with atomic_writer(path, 'wb') as fp:
+                fp.write(shard)
+            downloaded.append(entry)
+
+        with atomic_writer(os.path.join(directory, MANIFEST), 'wb') as fp:
+            fp.write(body)
+
+        # shards of earlier versions
+        keep = {os.path.basename(shard_path(directory, entry)) for entry in manifest['shards']}
+        for name in os.listdir(directory):
+            if name.endswith('.jsonl') and name not in keep:
+                os.unlink(os.path.join(directory, name))
+
+    return manifest, downloaded
+
+
+def load(directory):
+    """Merge the local shards in manifest order.
+
+    A keyword keeps the position of its first occurrence and the value
+    of its last one.
+
+    :returns: ``(header, records)`` like :func:`mlformat.load`, with a
+        list of records and the aliases of the manifest
+
+    """
+    bases = []
+    base_ids = {}
+    merged = {}
+    # a concurrent sync() deletes the shards of the version it replaces
+    with LockFile(os.path.join(directory, MANIFEST)):
+        manifest = read_manifest(directory)
+        if manifest is None:
+            raise ValueError('no local shards in {0}'.format(directory))
+        for entry in manifest['shards']:
+            with open(shard_path(directory, entry), encoding='utf-8') as fp:
+                header, records = mlformat.load(fp)
+                ids = []
+                for base in header['bases']:
+                    if base not in base_ids:
+                        base_ids[base] = len(bases)
+                        bases.append(base)
+                    ids.append(base_ids[base])
+                for key, base_id, suffix, desc in records:
+                    merged[key] = (key, ids[base_id], suffix, desc)
+
+    header = {'format': mlformat.FORMAT, 'version': mlformat.VERSION, 'bases': bases}
+    if manifest.get('aliases'):
+        header['aliases'] = manifest['aliases']
+    return header, list(merged.values())
@@ -24,6 +24,7 @@ import subprocess
 import sys
 
 from workflow import Workflow
+from workflow.util import LockFile
 
 __all__ = ["is_running", "run_in_background"]
 
@@ -217,25 +218,36 @@ def run_in_background(name, args, **kwargs):
 
     If that process fails, an error will be written to the log file.
 
-    If a process is already running under the same name, this function will
-    return immediately and will not run the specified command.
+    If a process is already running under the same name, or another
+    process is starting it, this function will return immediately and
+    will not run the specified command.
 
     """
-    if is_running(name):
-        _log().info("[%s] job already running", name)
+    # the job's PID file only exists once it's forked, so starting it is
+    # locked: concurrent calls would all find it not running otherwise
+    lock = LockFile(_pid_file(name))
+    if not lock.acquire(blocking=False):
+        _log().info("[%s] job already starting", name)
         return
 
-    argcache = _arg_cache(name)
+    try:
+        if is_running(name):
+            _log().info("[%s] job already running", name)
+            return
 
-    # Cache arguments
-    with open(argcache, "wb") as fp:
-        pickle.dump({"args": args, "kwargs": kwargs}, fp)
-        _log().debug("[%s] command cached: %s", name, argcache)
+        argcache = _arg_cache(name)
 
-    # Call this script
-    cmd = [sys.executable, "-m", "workflow.background", name]
-    _log().debug("[%s] passing job to background runner: %r", name, cmd)
-    retcode = subprocess.call(cmd)
+        # Cache arguments
+        with open(argcache, "wb") as fp:
+            pickle.dump({"args": args, "kwargs": kwargs}, fp)
+            _log().debug("[%s] command cached: %s", name, argcache)
+
+        # Call this script
+        cmd = [sys.executable, "-m", "workflow.background", name]
+        _log().debug("[%s] passing job to background runner: %r", name, cmd)
+        retcode = subprocess.call(cmd)
+    finally:
+        lock.release()
 
     if retcode:  # pragma: no cover
         _log().error("[%s] background runner failed with %d", name, retcode)
@@ -490,6 +490,7 @@ def check_update(repo, current_version, prereleases=False, alfred_version=None):
     if not len(dls):
         wf().logger.warning("no valid downloads for %s", repo)
         wf().cache_data(key, no_update)
+        wf().set_update_status()
         return False
 
     wf().logger.info("%d download(s) for %s", len(dls), repo)
@@ -499,6 +500,7 @@ def check_update(repo, current_version, prereleases=False, alfred_version=None):
     if not dl:
         wf().logger.warning("no compatible downloads for %s", repo)
         wf().cache_data(key, no_update)
+        wf().set_update_status()
         return False
 
     wf().logger.debug("latest=%r, installed=%r", dl.version, current)
@@ -507,9 +509,11 @@ def check_update(repo, current_version, prereleases=False, alfred_version=None):
         wf().cache_data(
             key, {"version": str(dl.version), "download": dl.dict, "available": True}
         )
+        wf().set_update_status(dl.version)
         return True
 
     wf().cache_data(key, no_update)
+    wf().set_update_status()
     return False
 
 
@@ -539,6 +543,7 @@ def install_update():
     subprocess.call(["open", path])  # nosec
 
     wf().cache_data(key, no_update)
+    wf().set_update_status()
     return True
 
 
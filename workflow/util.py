@@ -448,7 +448,9 @@ def atomic_writer(fpath, mode):
     .. versionadded:: 1.12
 
     Context manager that ensures the file is only written if the write
-    succeeds. The data is first written to a temporary file.
+    succeeds. The data is first written to a temporary file, which is
+    flushed to disk before it replaces ``fpath``, so readers never see
+    a partly written file.
 
     :param fpath: path of file to write to.
     :type fpath: ``unicode``
@@ -461,6 +463,8 @@ def atomic_writer(fpath, mode):
     with open(temppath, mode) as fp:
         try:
             yield fp
+            fp.flush()
+            os.fsync(fp.fileno())
             os.rename(temppath, fpath)
         finally:
             try:
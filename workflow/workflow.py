@@ -20,6 +20,7 @@ up your Python script to best utilise the :class:`Workflow` object.
 """
 
 
+import atexit
 import binascii
 import json
 import logging
@@ -34,6 +35,7 @@ import subprocess
 import sys
 import time
 import unicodedata
+from collections import deque
 from contextlib import contextmanager
 from copy import deepcopy
 from typing import Optional
@@ -442,6 +444,25 @@ MATCH_ALL = 127
 # Number of days to wait between checking for updates to the workflow
 DEFAULT_UPDATE_FREQUENCY = 1
 
+# Result of the last update check: empty if there is no update, else
+# the version of the update. Written by `update.py`
+UPDATE_STATUS_FILE = "__workflow_update_status"
+
+####################################################################
+# Used by `Workflow.timer` and the `workflow:perf` magic argument
+####################################################################
+
+# Runs whose timings are kept in the cache directory
+PERF_HISTORY = 50
+PERF_HISTORY_FILE = "__workflow_perf.json"
+
+####################################################################
+# Used by `Workflow.logger`
+####################################################################
+
+# Log records kept in memory until they're written to the log file
+LOG_BUFFER_SIZE = 1000
+
 
 ####################################################################
 # Keychain access errors
@@ -803,6 +824,11 @@ class Settings(dict):
     at ``filepath``. If the file does not exist, the dictionary
     (and settings file) will be initialised with ``defaults``.
 
+    Changes are written once, at exit or when :meth:`save` is called,
+    not on every assignment. Only the keys changed by this instance
+    are written: the file is read again under its lock, so keys changed
+    by other processes in the meantime are kept.
+
     :param filepath: where to save the settings
     :type filepath: :class:`unicode`
     :param defaults: dict of default settings
@@ -820,19 +846,22 @@ class Settings(dict):
         self._filepath = filepath
         self._nosave = False
         self._original = {}
+        # keys set or deleted since the file was last read or written
+        self._dirty = set()
+        self._save_at_exit = False
         if os.path.exists(self._filepath):
             self._load()
         elif defaults:
             for key, val in list(defaults.items()):
                 self[key] = val
-            self.save()  # save default settings
 
     def _load(self):
         """Load cached settings from JSON file `self._filepath`."""
         data = {}
-        with LockFile(self._filepath, 0.5):
-            with open(self._filepath, "r") as fp:
-                data.update(json.load(fp))
+        # no lock needed, atomic_writer() only renames complete files
+        # into place
+        with open(self._filepath, "r") as fp:
+            data.update(json.load(fp))
 
         self._original = deepcopy(data)
 
@@ -840,6 +869,20 @@ class Settings(dict):
         self.update(data)
         self._nosave = False
 
+    def _changed(self, keys):
+        """Mark ``keys`` to be written by :meth:`save`."""
+        if self._nosave:
+            return
+        self._dirty.update(keys)
+        if self._dirty and not self._save_at_exit:
+            atexit.register(self.save)
+            self._save_at_exit = True
+
+    @property
+    def dirty(self):
+        """Whether there are changes :meth:`save` hasn't written yet."""
+        return bool(self._dirty)
+
     @uninterruptible
     def save(self):
         """Save settings to JSON file specified in ``self._filepath``.
@@ -847,39 +890,114 @@ class Settings(dict):
         If you're using this class via :attr:`Workflow.settings`, which
         you probably are, ``self._filepath`` will be ``settings.json``
         in your workflow's data directory (see :attr:`~Workflow.datadir`).
+
+        Nothing is written if nothing changed. This is called at exit,
+        call it to write the changes earlier.
         """
-        if self._nosave:
+        if self._nosave or not self._dirty:
             return
 
-        data = {}
-        data.update(self)
-
         with LockFile(self._filepath, 0.5):
+            # merge with what other processes saved
+            try:
+                with open(self._filepath, "r") as fp:
+                    data = json.load(fp)
+                for key in self._dirty:
+                    if key in self:
+                        data[key] = self[key]
+                    else:
+                        data.pop(key, None)
+            except (OSError, ValueError):
+                data = dict(self)
+
             with atomic_writer(self._filepath, "w") as fp:
                 json.dump(data, fp, sort_keys=True, indent=2)
 
+        self._dirty.clear()
+        self._original = deepcopy(data)
+        super(Settings, self).update(data)
+
+    def discard(self):
+        """Forget the changes :meth:`save` hasn't written yet."""
+        self._dirty.clear()
+
     # dict methods
     def __setitem__(self, key, value):
         """Implement :class:`dict` interface."""
-        if self._original.get(key) != value:
-            super(Settings, self).__setitem__(key, value)
-            self.save()
+        super(Settings, self).__setitem__(key, value)
+        if self._original.get(key, UNSET) != value:
+            self._changed((key,))
 
     def __delitem__(self, key):
         """Implement :class:`dict` interface."""
         super(Settings, self).__delitem__(key)
-        self.save()
+        self._changed((key,))
 
     def update(self, *args, **kwargs):
         """Override :class:`dict` method to save on update."""
-        super(Settings, self).update(*args, **kwargs)
-        self.save()
+        changes = dict(*args, **kwargs)
+        super(Settings, self).update(changes)
+        self._changed(
+            key for key, value in changes.items()
+            if self._original.get(key, UNSET) != value
+        )
 
     def setdefault(self, key, value=None):
         """Override :class:`dict` method to save on update."""
-        ret = super(Settings, self).setdefault(key, value)
-        self.save()
-        return ret
+        if key not in self:
+            self[key] = value
+        return self[key]
+
+
+class BufferedHandler(logging.Handler):
+    """Log handler that keeps records in memory until they're needed.
+
+    The last ``capacity`` records are kept and handed to ``target``
+    when a record of ``flush_level`` or above comes in, when
+    :meth:`flush` is called or when logging is shut down at exit. Runs
+    that log nothing important never touch ``target``.
+
+    :param target: handler the records are written to
+    :type target: :class:`logging.Handler`
+    :param capacity: number of records to keep, older ones are dropped
+    :type capacity: ``int``
+    :param flush_level: level of the records written out immediately,
+        along with everything before them
+    :type flush_level: ``int``
+
+    """
+
+    def __init__(self, target, capacity=LOG_BUFFER_SIZE, flush_level=logging.ERROR):
+        """Create new :class:`BufferedHandler` object."""
+        super(BufferedHandler, self).__init__()
+        self.target = target
+        self.flush_level = flush_level
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        """Keep ``record``, write out the buffer if it's an error."""
+        self.records.append(record)
+        if record.levelno >= self.flush_level:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered records to :attr:`target`."""
+        self.acquire()
+        try:
+            if self.records:
+                while self.records:
+                    self.target.handle(self.records.popleft())
+                self.target.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        """Write out the buffered records and close :attr:`target`."""
+        try:
+            self.flush()
+            self.target.close()
+        finally:
+            super(BufferedHandler, self).close()
 
 
 class Workflow(object):
@@ -971,23 +1089,16 @@ class Workflow(object):
         self._last_version_run = UNSET
         # Cache for regex patterns created for filter keys
         self._search_pattern_cache = {}
+        #: Nanoseconds spent in each phase of this run, see :meth:`timer`.
+        self.timings = {}
         #: Prefix for all magic arguments.
         #: The default value is ``workflow:`` so keyword
         #: ``config`` would match user query ``workflow:config``.
         self.magic_prefix = "workflow:"
-        #: Mapping of available magic arguments. The built-in magic
-        #: arguments are registered by default. To add your own magic arguments
-        #: (or override built-ins), add a key:value pair where the key is
-        #: what the user should enter (prefixed with :attr:`magic_prefix`)
-        #: and the value is a callable that will be called when the argument
-        #: is entered. If you would like to display a message in Alfred, the
-        #: function should return a ``unicode`` string.
-        #:
-        #: By default, the magic arguments documented
-        #: :ref:`here <magic-arguments>` are registered.
-        self.magic_arguments = {}
-
-        self._register_default_magic()
+        # see magic_arguments
+        self._magic_arguments = None
+        # (sys.argv[1:], decoded args), see args
+        self._args = None
 
         if libraries:
             sys.path = libraries + sys.path
@@ -1193,6 +1304,33 @@ class Workflow(object):
 
     # Workflow utility methods -----------------------------------------
 
+    @property
+    def magic_arguments(self):
+        """Mapping of available magic arguments.
+
+        The built-in magic arguments are registered by default. To add
+        your own magic arguments (or override built-ins), add a key:value
+        pair where the key is what the user should enter (prefixed with
+        :attr:`magic_prefix`) and the value is a callable that will be
+        called when the argument is entered. If you would like to display
+        a message in Alfred, the function should return a ``unicode``
+        string.
+
+        By default, the magic arguments documented
+        :ref:`here <magic-arguments>` are registered, when the mapping is
+        first used. :attr:`args` only uses it if an argument starts with
+        :attr:`magic_prefix`.
+
+        """
+        if self._magic_arguments is None:
+            self._magic_arguments = {}
+            self._register_default_magic()
+        return self._magic_arguments
+
+    @magic_arguments.setter
+    def magic_arguments(self, value):
+        self._magic_arguments = value
+
     @property
     def args(self):
         """Return command line args as normalised unicode.
@@ -1210,16 +1348,25 @@ class Workflow(object):
 
         See :ref:`Magic arguments <magic-arguments>` for details.
 
+        The args are only decoded (and checked for magic arguments) once,
+        until ``sys.argv`` changes.
+
         """
+        argv = tuple(sys.argv[1:])
+        if self._args is not None and self._args[0] == argv:
+            return list(self._args[1])
+
         msg = None
-        args = [self.decode(arg) for arg in sys.argv[1:]]
+        args = [self.decode(arg) for arg in argv]
 
         # Handle magic args
         if len(args) and self._capture_args:
-            for name in self.magic_arguments:
-                key = "{0}{1}".format(self.magic_prefix, name)
-                if key in args:
-                    msg = self.magic_arguments[name]()
+            prefix = self.magic_prefix
+            for arg in args:
+                if arg.startswith(prefix):
+                    func = self.magic_arguments.get(arg[len(prefix):])
+                    if func is not None:
+                        msg = func()
 
             if msg:
                 self.logger.debug(msg)
@@ -1227,7 +1374,9 @@ class Workflow(object):
                     self.add_item(msg, valid=False, icon=ICON_INFO)
                     self.send_feedback()
                 sys.exit(0)
-        return args
+
+        self._args = (argv, args)
+        return list(args)
 
     @property
     def cachedir(self):
@@ -1401,6 +1550,11 @@ class Workflow(object):
         If Alfred's debugger is open, log level will be ``DEBUG``,
         else it will be ``INFO``.
 
+        The log file is only opened once something is written to it.
+        Unless Alfred's debugger is open, records are kept in a
+        :class:`BufferedHandler` and written to the file on an error or
+        at exit.
+
         Use :meth:`open_log` to open the log file in Console.
 
         :returns: an initialised :class:`~logging.Logger`
@@ -1423,10 +1577,13 @@ class Workflow(object):
             )
 
             logfile = logging.handlers.RotatingFileHandler(
-                self.logfile, maxBytes=1024 * 1024, backupCount=1
+                self.logfile, maxBytes=1024 * 1024, backupCount=1, delay=True
             )
             logfile.setFormatter(fmt)
-            logger.addHandler(logfile)
+            if self.debugging:
+                logger.addHandler(logfile)
+            else:
+                logger.addHandler(BufferedHandler(logfile))
 
             console = logging.StreamHandler()
             console.setFormatter(fmt)
@@ -1479,9 +1636,10 @@ class Workflow(object):
         :rtype: :class:`~workflow.workflow.Settings` instance
 
         """
-        if not self._settings:
+        if self._settings is None:
             self.logger.debug("reading settings from %s", self.settings_path)
-            self._settings = Settings(self.settings_path, self._default_settings)
+            with self.timer("settings"):
+                self._settings = Settings(self.settings_path, self._default_settings)
         return self._settings
 
     @property
@@ -1690,30 +1848,50 @@ class Workflow(object):
 
         self.logger.debug("saved data: %s", data_path)
 
-    def cached_data(self, name, data_func=None, max_age=60):
+    def cached_data(self, name, data_func=None, max_age=60, serializer=None,
+                    revalidate=None):
         """Return cached data if younger than ``max_age`` seconds.
 
         Retrieve data from cache or re-generate and re-cache data if
         stale/non-existant. If ``max_age`` is 0, return cached data no
         matter how old.
 
+        With ``revalidate``, data that is merely too old is still
+        returned (stale-while-revalidate), and ``revalidate`` is run
+        with :func:`~workflow.background.run_in_background` to refresh
+        the cache. Only one refresh of ``name`` runs at a time, later
+        calls use its data once it's been written (atomically).
+        ``data_func`` is only called if there is no cached data at all.
+
         :param name: name of datastore
         :param data_func: function to (re-)generate data.
         :type data_func: ``callable``
         :param max_age: maximum age of cached data in seconds
         :type max_age: ``int``
+        :param serializer: name of serializer to use. If no serializer
+            is specified, :attr:`cache_serializer` is used.
+        :param revalidate: command that refreshes the cache, i.e. calls
+            :meth:`cache_data`, as a list of arguments for
+            :func:`subprocess.call`
+        :type revalidate: ``list``
         :returns: cached data, return value of ``data_func`` or ``None``
             if ``data_func`` is not set
 
         """
-        serializer = manager.serializer(self.cache_serializer)
+        serializer_name = serializer or self.cache_serializer
+        serializer = manager.serializer(serializer_name)
 
-        cache_path = self.cachefile("%s.%s" % (name, self.cache_serializer))
-        age = self.cached_data_age(name)
+        cache_path = self.cachefile("%s.%s" % (name, serializer_name))
+        age = self.cached_data_age(name, serializer_name)
 
-        if (age < max_age or max_age == 0) and os.path.exists(cache_path):
+        if (age < max_age or max_age == 0 or revalidate) and os.path.exists(cache_path):
+            if revalidate and max_age and age >= max_age:
+                from workflow.background import run_in_background
 
-            with open(cache_path, "rb") as file_obj:
+                self.logger.debug("cached data expired, refreshing it: %s", cache_path)
+                run_in_background("__workflow_refresh_" + name, revalidate)
+
+            with open(cache_path, "rb") as file_obj, self.timer("cache " + name):
                 self.logger.debug("loading cached data: %s", cache_path)
                 return serializer.load(file_obj)
 
@@ -1721,11 +1899,11 @@ class Workflow(object):
             return None
 
         data = data_func()
-        self.cache_data(name, data)
+        self.cache_data(name, data, serializer=serializer_name)
 
         return data
 
-    def cache_data(self, name, data):
+    def cache_data(self, name, data, serializer=None):
         """Save ``data`` to cache under ``name``.
 
         If ``data`` is ``None``, the corresponding cache file will be
@@ -1734,11 +1912,14 @@ class Workflow(object):
         :param name: name of datastore
         :param data: data to store. This may be any object supported by
                 the cache serializer
+        :param serializer: name of serializer to use. If no serializer
+            is specified, :attr:`cache_serializer` is used.
 
         """
-        serializer = manager.serializer(self.cache_serializer)
+        serializer_name = serializer or self.cache_serializer
+        serializer = manager.serializer(serializer_name)
 
-        cache_path = self.cachefile("%s.%s" % (name, self.cache_serializer))
+        cache_path = self.cachefile("%s.%s" % (name, serializer_name))
 
         if data is None:
             if os.path.exists(cache_path):
@@ -1751,33 +1932,38 @@ class Workflow(object):
 
         self.logger.debug("cached data: %s", cache_path)
 
-    def cached_data_fresh(self, name, max_age):
+    def cached_data_fresh(self, name, max_age, serializer=None):
         """Whether cache `name` is less than `max_age` seconds old.
 
         :param name: name of datastore
         :param max_age: maximum age of data in seconds
         :type max_age: ``int``
+        :param serializer: name of the serializer the data was cached
+            with. Defaults to :attr:`cache_serializer`.
         :returns: ``True`` if data is less than ``max_age`` old, else
             ``False``
 
         """
-        age = self.cached_data_age(name)
+        age = self.cached_data_age(name, serializer)
 
         if not age:
             return False
 
         return age < max_age
 
-    def cached_data_age(self, name):
+    def cached_data_age(self, name, serializer=None):
         """Return age in seconds of cache `name` or 0 if cache doesn't exist.
 
         :param name: name of datastore
         :type name: ``unicode``
+        :param serializer: name of the serializer the data was cached
+            with. Defaults to :attr:`cache_serializer`.
         :returns: age of datastore in seconds
         :rtype: ``int``
 
         """
-        cache_path = self.cachefile("%s.%s" % (name, self.cache_serializer))
+        serializer_name = serializer or self.cache_serializer
+        cache_path = self.cachefile("%s.%s" % (name, serializer_name))
 
         if not os.path.exists(cache_path):
             return 0
@@ -2082,6 +2268,7 @@ class Workflow(object):
 
         """
         start = time.time()
+        start_ns = time.perf_counter_ns()
 
         # Write to debugger to ensure "real" output starts on a new line
         print(".", file=sys.stderr)
@@ -2133,12 +2320,82 @@ class Workflow(object):
             return 1
 
         finally:
+            self.timings["run"] = time.perf_counter_ns() - start_ns
+            try:
+                if self.perf_enabled:
+                    self.save_timings()
+            except Exception:
+                self.logger.exception("couldn't save timings")
             self.logger.debug(
                 "---------- finished in %0.3fs ----------", time.time() - start
             )
 
         return 0
 
+    # Timings ----------------------------------------------------------
+
+    @contextmanager
+    def timer(self, name):
+        """Time the code in the ``with`` block as phase ``name``.
+
+        The nanoseconds are added to :attr:`timings`, so a phase may
+        be timed in several blocks. :meth:`run` times the whole run as
+        ``run``, and the built-in phases are ``settings``, ``cache
+        <name>`` (loading cached data) and ``feedback``.
+
+        Timing a block costs about a microsecond, the timings are only
+        kept if :attr:`perf_enabled` is set.
+
+        :param name: name of the phase
+        :type name: ``unicode``
+
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.timings[name] = (
+                self.timings.get(name, 0) + time.perf_counter_ns() - start
+            )
+
+    @property
+    def perf_enabled(self):
+        """Whether :meth:`run` keeps the timings of the run.
+
+        Turned on by setting the ``WORKFLOW_PERF`` environment variable
+        to ``1`` or with the ``workflow:perfon`` magic argument. The
+        last :data:`PERF_HISTORY` runs are shown by ``workflow:perf``.
+
+        :returns: ``True`` or ``False``
+        :rtype: ``bool``
+
+        """
+        return os.getenv("WORKFLOW_PERF") == "1" or bool(
+            self.settings.get("__workflow_perf")
+        )
+
+    def perf_history(self):
+        """Return the timings of the last runs, oldest first.
+
+        :returns: list of ``{"time": <epoch>, "timings": {<phase>: <ns>}}``
+        :rtype: ``list``
+
+        """
+        try:
+            with open(self.cachefile(PERF_HISTORY_FILE), "rb") as fp:
+                return json.loads(fp.read().decode("utf-8"))
+        except (OSError, ValueError):
+            return []
+
+    def save_timings(self):
+        """Add :attr:`timings` to the history shown by ``workflow:perf``."""
+        path = self.cachefile(PERF_HISTORY_FILE)
+        with LockFile(path):
+            history = self.perf_history()
+            history.append({"time": time.time(), "timings": self.timings})
+            with atomic_writer(path, "w") as fp:
+                json.dump(history[-PERF_HISTORY:], fp)
+
     # Alfred feedback methods ------------------------------------------
 
     def add_item(
@@ -2234,12 +2491,13 @@ class Workflow(object):
 
     def send_feedback(self):
         """Print stored items to console/Alfred as XML."""
-        root = ET.Element("items")
-        for item in self._items:
-            root.append(item.elem)
-        sys.stdout.write('<?xml version="1.0" encoding="utf-8"?>\n')
-        sys.stdout.write(ET.tostring(root, encoding="unicode"))
-        sys.stdout.flush()
+        with self.timer("feedback"):
+            root = ET.Element("items")
+            for item in self._items:
+                root.append(item.elem)
+            sys.stdout.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            sys.stdout.write(ET.tostring(root, encoding="unicode"))
+            sys.stdout.flush()
 
     ####################################################################
     # Updating methods
@@ -2324,19 +2582,33 @@ class Workflow(object):
         See :ref:`guide-updates` in the :ref:`user-manual` for detailed
         information on how to enable your workflow to update itself.
 
+        It's checked on every run, so it only reads the small status
+        file written by :meth:`set_update_status`, which is empty
+        unless there is an update.
+
         :returns: ``True`` if an update is available, else ``False``
 
         """
-        key = "__workflow_latest_version"
-        # Create a new workflow object to ensure standard serialiser
-        # is used (update.py is called without the user's settings)
-        status = Workflow().cached_data(key, max_age=0)
-
-        # self.logger.debug('update status: %r', status)
-        if not status or not status.get("available"):
+        try:
+            with open(self.cachefile(UPDATE_STATUS_FILE), "rb") as fp:
+                return bool(fp.read(64).strip())
+        except OSError:
             return False
 
-        return status["available"]
+    def set_update_status(self, version=None):
+        """Record the result of an update check.
+
+        Called by ``update.py``, see :attr:`update_available`. The
+        time of the last check is the modification time of the status
+        file.
+
+        :param version: version of the available update or ``None``
+        :type version: :class:`~workflow.update.Version` instance
+            or ``unicode``
+
+        """
+        with atomic_writer(self.cachefile(UPDATE_STATUS_FILE), "w") as fp:
+            fp.write(str(version) if version else "")
 
     @property
     def prereleases(self):
@@ -2369,15 +2641,19 @@ class Workflow(object):
         :type force: ``Boolean``
 
         """
-        key = "__workflow_latest_version"
         frequency = self._update_settings.get("frequency", DEFAULT_UPDATE_FREQUENCY)
 
         if not force and not self.settings.get("__workflow_autoupdate", True):
             self.logger.debug("Auto update turned off by user")
             return
 
+        try:
+            checked = os.stat(self.cachefile(UPDATE_STATUS_FILE)).st_mtime
+        except OSError:
+            checked = 0
+
         # Check for new version if it's time
-        if force or not self.cached_data_fresh(key, frequency * 86400):
+        if force or time.time() - checked >= frequency * 86400:
             repo = self._update_settings["github_slug"]
             # version = self._update_settings['version']
             version = str(self.version)
@@ -2642,7 +2918,7 @@ class Workflow(object):
 
         def list_magic():
             """Display all available magic args in Alfred."""
-            isatty = sys.stderr.isatty()
+            isatty = sys.stdout.isatty()
             for name in sorted(self.magic_arguments.keys()):
                 if name == "magic":
                     continue
@@ -2659,6 +2935,50 @@ class Workflow(object):
         self.magic_arguments["magic"] = list_magic
         self.magic_arguments["version"] = show_version
 
+        # Timings
+        def perf_on():
+            self.settings["__workflow_perf"] = True
+            return "Timings will be recorded"
+
+        def perf_off():
+            self.settings["__workflow_perf"] = False
+            return "Timings will not be recorded"
+
+        def show_perf():
+            """Show the median and slowest time of each phase."""
+            history = self.perf_history()
+            if not history:
+                return "No timings recorded, turn them on with {0}perfon".format(
+                    self.magic_prefix
+                )
+
+            phases = {}
+            for run in history:
+                for name, ns in run["timings"].items():
+                    phases.setdefault(name, []).append(ns / 1e6)
+
+            isatty = sys.stdout.isatty()
+            for name, times in phases.items():
+                times.sort()
+                subtitle = (
+                    "median {0:.2f} ms, 90th percentile {1:.2f} ms, "
+                    "max {2:.2f} ms ({3} runs)"
+                ).format(
+                    times[len(times) // 2],
+                    times[min(len(times) - 1, len(times) * 9 // 10)],
+                    times[-1],
+                    len(times),
+                )
+                self.logger.debug("%s: %s", name, subtitle)
+                if not isatty:
+                    self.add_item(name, subtitle, icon=ICON_CLOCK)
+
+            return "Timings of the last {0} runs".format(len(history))
+
+        self.magic_arguments["perfon"] = perf_on
+        self.magic_arguments["perfoff"] = perf_off
+        self.magic_arguments["perf"] = show_perf
+
     def clear_cache(self, filter_func=lambda f: True):
         """Delete all files in workflow's :attr:`cachedir`.
 
@@ -2685,6 +3005,9 @@ class Workflow(object):
 
     def clear_settings(self):
         """Delete workflow's :attr:`settings_path`."""
+        if self._settings is not None:
+            # don't write them back at exit
+            self._settings.discard()
         if os.path.exists(self.settings_path):
             os.unlink(self.settings_path)
             self.logger.debug("deleted : %r", self.settings_path)
@@ -2818,10 +3141,14 @@ class Workflow(object):
                 if not filter_func(filename):
                     continue
                 path = os.path.join(dirpath, filename)
-                if os.path.isdir(path):
-                    shutil.rmtree(path)
-                else:
-                    os.unlink(path)
+                try:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.unlink(path)
+                except FileNotFoundError:
+                    # deleted by another process clearing the same files
+                    continue
                 self.logger.debug("deleted : %r", path)
 
     def _load_info_plist(self):
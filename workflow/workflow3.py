@@ -27,9 +27,29 @@ of them, and they won't be sent to Alfred when you call
 import json
 import os
 import sys
+from json.encoder import encode_basestring_ascii
 
 from .workflow import ICON_WARNING, Workflow
 
+_encode = json.JSONEncoder().encode
+
+#: Encoded ``"icon"`` members by ``(icon, icontype)``. Results mostly
+#: share a handful of icons.
+_icon_json = {}
+
+_valid_json = {True: ', "valid": true', False: ', "valid": false'}
+
+#: Last encoded ``"variables"`` member, items usually all have the
+#: workflow's variables.
+_variables_json = (None, "")
+
+
+def _value_json(value):
+    """Encode ``value`` like :func:`json.dumps`, strings the fast way."""
+    if type(value) is str:
+        return encode_basestring_ascii(value)
+    return _encode(value)
+
 
 class Variables(dict):
     """Workflow variables for Run Script actions.
@@ -405,6 +425,61 @@ class Item3(object):
 
         return o
 
+    def to_json(self):
+        """Item encoded as JSON.
+
+        The same as ``json.dumps(item.obj)``, without building the
+        :attr:`obj` dicts: the members are encoded one by one and the
+        ``valid`` and ``icon`` members, shared by most items, are
+        only encoded once.
+
+        Returns:
+            unicode: JSON object.
+
+        """
+        valid = _valid_json.get(self.valid) if type(self.valid) is bool else None
+        parts = [
+            '{"title": ',
+            _value_json(self.title),
+            ', "subtitle": ',
+            _value_json(self.subtitle),
+            valid or ', "valid": ' + _encode(self.valid),
+        ]
+
+        for name in ("arg", "autocomplete", "match", "uid", "type", "quicklookurl"):
+            value = getattr(self, name)
+            if value is not None:
+                parts.append(', "{0}": {1}'.format(name, _value_json(value)))
+
+        if self.variables:
+            global _variables_json
+            last = _variables_json
+            if last[0] != self.variables:
+                last = _variables_json = (
+                    dict(self.variables),
+                    ', "variables": ' + _encode(self.variables),
+                )
+            parts.append(last[1])
+
+        if self.config:
+            parts.append(', "config": ' + _encode(self.config))
+
+        if self.largetext is not None or self.copytext is not None:
+            parts.append(', "text": ' + _encode(self._text()))
+
+        if self.icon is not None or self.icontype is not None:
+            key = (self.icon, self.icontype)
+            icon = _icon_json.get(key)
+            if icon is None:
+                icon = _icon_json[key] = ', "icon": ' + _encode(self._icon())
+            parts.append(icon)
+
+        if self.modifiers:
+            parts.append(', "mods": ' + _encode(self._modifiers()))
+
+        parts.append("}")
+        return "".join(parts)
+
     def _icon(self):
         """Return `icon` object for item.
 
@@ -639,7 +714,7 @@ class Workflow3(Workflow):
         """New cache name/key based on session ID."""
         return self._session_prefix + name
 
-    def cache_data(self, name, data, session=False):
+    def cache_data(self, name, data, session=False, serializer=None):
         """Cache API with session-scoped expiry.
 
         .. versionadded:: 1.25
@@ -649,6 +724,8 @@ class Workflow3(Workflow):
             data (object): Data to cache
             session (bool, optional): Whether to scope the cache
                 to the current session.
+            serializer (str, optional): Name of serializer to use
+                instead of :attr:`cache_serializer`.
 
         ``name`` and ``data`` are the same as for the
         :meth:`~workflow.Workflow.cache_data` method on
@@ -661,9 +738,12 @@ class Workflow3(Workflow):
         if session:
             name = self._mk_session_name(name)
 
-        return super(Workflow3, self).cache_data(name, data)
+        return super(Workflow3, self).cache_data(name, data, serializer)
 
-    def cached_data(self, name, data_func=None, max_age=60, session=False):
+    def cached_data(
+        self, name, data_func=None, max_age=60, session=False, serializer=None,
+        revalidate=None,
+    ):
         """Cache API with session-scoped expiry.
 
         .. versionadded:: 1.25
@@ -675,6 +755,11 @@ class Workflow3(Workflow):
             max_age (int): Maximum allowable age of cache in seconds.
             session (bool, optional): Whether to scope the cache
                 to the current session.
+            serializer (str, optional): Name of serializer to use
+                instead of :attr:`cache_serializer`.
+            revalidate (list, optional): Command that refreshes the
+                cache in the background, see
+                :meth:`~workflow.Workflow.cached_data`.
 
         ``name``, ``data_func`` and ``max_age`` are the same as for the
         :meth:`~workflow.Workflow.cached_data` method on
@@ -687,7 +772,9 @@ class Workflow3(Workflow):
         if session:
             name = self._mk_session_name(name)
 
-        return super(Workflow3, self).cached_data(name, data_func, max_age)
+        return super(Workflow3, self).cached_data(
+            name, data_func, max_age, serializer=serializer, revalidate=revalidate
+        )
 
     def clear_session_cache(self, current=False):
         """Remove session data from the cache.
@@ -732,6 +819,23 @@ class Workflow3(Workflow):
             o["rerun"] = self.rerun
         return o
 
+    def to_json(self):
+        """Feedback encoded as JSON.
+
+        The same as ``json.dumps(wf.obj)``, see :meth:`Item3.to_json`.
+
+        Returns:
+            unicode: JSON object.
+
+        """
+        parts = ['{"items": [', ", ".join(item.to_json() for item in self._items), "]"]
+        if self.variables:
+            parts.append(', "variables": ' + _encode(self.variables))
+        if self.rerun:
+            parts.append(', "rerun": ' + _encode(self.rerun))
+        parts.append("}")
+        return "".join(parts)
+
     def warn_empty(self, title, subtitle="", icon=None):
         """Add a warning to feedback if there are no items.
 
@@ -760,8 +864,9 @@ class Workflow3(Workflow):
 
     def send_feedback(self):
         """Print stored items to console/Alfred as JSON."""
-        if self.debugging:
-            json.dump(self.obj, sys.stdout, indent=2, separators=(",", ": "))
-        else:
-            json.dump(self.obj, sys.stdout)
-        sys.stdout.flush()
+        with self.timer("feedback"):
+            if self.debugging:
+                json.dump(self.obj, sys.stdout, indent=2, separators=(",", ": "))
+            else:
+                sys.stdout.write(self.to_json())
+            sys.stdout.flush()